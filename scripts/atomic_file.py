@@ -0,0 +1,70 @@
+"""Atomic file writes shared by the Python scripts.
+
+Readers (the storefront, a concurrent pipeline step, the next run after a
+crash) must never see a half-written file, so every rewrite goes through a
+temp file in the target's directory that is fsynced, then renamed over the
+target:
+
+    write_atomic(path, text_or_bytes)
+
+    with AtomicFile(path, "wb") as f:      # streamed writes
+        for chunk in chunks:
+            f.write(chunk)
+        f.commit()                          # not committed → temp file removed
+
+commit() may also rename to another path in the same directory tree, for
+content-addressed files whose name is only known once written.
+"""
+
+import os
+import threading
+from pathlib import Path
+
+
+class AtomicFile:
+    """Temp file next to ``path``; commit() fsyncs it and renames it over ``path``.
+
+    Leaving the ``with`` block without commit() (no-op run, error) removes
+    the temp file and leaves ``path`` as it was.
+    """
+
+    def __init__(self, path, mode="w"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        self.file = open(self.tmp, mode, encoding=None if "b" in mode else "utf-8")
+        self.committed = False
+
+    def write(self, data):
+        return self.file.write(data)
+
+    def commit(self, path=None):
+        """Make the content visible at ``path`` (default: the target given at creation)."""
+        target = Path(path) if path else self.path
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self.tmp, target)
+        self.committed = True
+        return target
+
+    def discard(self):
+        if not self.file.closed:
+            self.file.close()
+        self.tmp.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.committed:
+            self.discard()
+        return False
+
+
+def write_atomic(path, data):
+    """Write text or bytes via a temp file in the same directory, fsync, then rename."""
+    with AtomicFile(path, "wb" if isinstance(data, bytes) else "w") as f:
+        f.write(data)
+        f.commit()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+bench-parse-specs.py — Micro-benchmark for parse_specs() on the datasheet corpus.
+
+Compares the SpecScanner-based parse_specs() of specs_extractor with the
+original one-regex-call-per-spec implementation kept below as the reference.
+Both must return identical specs for every PDF.
+
+Then counts the full-text passes per document for a growing number of
+fields: one per field with a re call per pattern, at most two (original and
+lowercased text) with SpecScanner, whatever the number of fields.
+
+Usage: python3 scripts/bench-parse-specs.py [--rounds 50]
+"""
+
+import argparse
+import re
+import time
+from pathlib import Path
+
+import specs_extractor as extractor
+
+DATASHEETS_DIR = Path(__file__).resolve().parent.parent / "public" / "datasheets"
+
+
+def reference_parse_specs(text, filename, patterns):
+    """parse_specs() as it was before SpecScanner: ~15 full-text re calls."""
+    specs = {}
+
+    kw_specific = re.search(
+        r'(?:rated|max|nominal|ac)\s*(?:output\s*)?power[^\d]*(\d{1,3}(?:\.\d)?)\s*kW',
+        text, re.IGNORECASE
+    )
+    kw_generic = re.search(patterns["power_kw"], text, re.IGNORECASE)
+    if kw_specific:
+        specs["power_kw"] = float(kw_specific.group(1))
+    elif kw_generic:
+        specs["power_kw"] = float(kw_generic.group(1))
+
+    if "power_kw" not in specs:
+        w_match = re.search(patterns["power_w"], text)
+        if w_match:
+            val = int(w_match.group(1))
+            if val > 100:
+                specs["power_w"] = val
+                specs["power_kw"] = round(val / 1000, 2)
+
+    eff = re.search(patterns["efficiency_pct"], text, re.IGNORECASE)
+    if eff:
+        val = float(eff.group(1))
+        if 80 <= val <= 100:
+            specs["efficiency_pct"] = val
+
+    if re.search(patterns["phases_3"], text, re.IGNORECASE):
+        specs["phases"] = 3
+    elif re.search(patterns["phases"], text, re.IGNORECASE):
+        specs["phases"] = 1
+
+    mppt = re.search(patterns["mppt_count"], text, re.IGNORECASE)
+    if mppt:
+        specs["mppt_count"] = int(mppt.group(1))
+
+    dims = re.search(patterns["dimensions"], text)
+    if dims:
+        specs["dimensions_mm"] = "x".join([dims.group(1), dims.group(2), dims.group(3)])
+
+    weights = re.findall(r'(\d{1,3}(?:\.\d)?)\s*kg', text)
+    if weights:
+        valid = [float(w) for w in weights if 1 < float(w) < 500]
+        if valid:
+            specs["weight_kg"] = min(valid)
+
+    ip = re.search(patterns["ip_rating"], text)
+    if ip:
+        specs["ip_rating"] = f"IP{ip.group(1)}"
+
+    temp = re.search(patterns["temp_range"], text)
+    if temp:
+        specs["operating_temp"] = f"{temp.group(1)}°C to +{temp.group(2)}°C"
+
+    warranty = re.search(patterns["warranty"], text, re.IGNORECASE)
+    if warranty:
+        specs["warranty_years"] = int(warranty.group(1))
+
+    kwh = re.search(patterns["capacity_kwh"], text, re.IGNORECASE)
+    if kwh:
+        specs["capacity_kwh"] = float(kwh.group(1))
+
+    ah = re.search(patterns["capacity_ah"], text)
+    if ah and "capacity_kwh" not in specs:
+        specs["capacity_ah"] = int(ah.group(1))
+
+    certs = list(set(re.findall(patterns["certifications"], text)))
+    if certs:
+        specs["certifications"] = sorted(certs)
+
+    return specs
+
+
+def time_per_doc(fn, docs, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for name, text in docs:
+            fn(text, name)
+    return (time.perf_counter() - start) / (rounds * len(docs))
+
+
+def scan_per_field(text, keys):
+    """The same matches as SpecScanner.scan(text, keys), with one re.search() per field."""
+    found = {}
+    for key in keys:
+        m = extractor.SpecScanner.COMPILED[key].search(text.lower() if key in extractor.ICASE_PATTERNS else text)
+        if m:
+            found[key] = m.groups()
+    return found
+
+
+def print_passes(docs, rounds):
+    keys = list(extractor.PATTERNS)
+    print("  fields | passes/doc: re per field  SpecScanner | ms/doc: re per field  SpecScanner")
+    for n in range(1, len(keys) + 1):
+        subset = keys[:n]
+        scanner = extractor.SpecScanner()
+        for _, text in docs:
+            if scanner.scan(text, subset)[0] != scan_per_field(text, subset):
+                print(f"  ❌ SpecScanner differs on {subset}")
+        per_doc = scanner.passes / len(docs)
+        naive = time_per_doc(lambda t, _: scan_per_field(t, subset), docs, rounds)
+        scan = time_per_doc(lambda t, _: extractor.SpecScanner().scan(t, subset), docs, rounds)
+        print(f"  {n:6} | {n:22} {per_doc:12.1f} | {naive * 1e3:18.3f} {scan * 1e3:12.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parse_specs() before/after SpecScanner")
+    parser.add_argument("--rounds", type=int, default=50, help="Passes over the corpus (default: 50)")
+    args = parser.parse_args()
+
+    pdfs = sorted(DATASHEETS_DIR.rglob("*.pdf"))
+    docs = [(p.name, extractor.extract_text(str(p))) for p in pdfs]
+    print(f"📄 {len(docs)} datasheets, {sum(len(t) for _, t in docs) // len(docs)} chars/doc on average")
+
+    mismatches = [
+        name for name, text in docs
+        if extractor.parse_specs(text, name) != reference_parse_specs(text, name, extractor.PATTERNS)
+    ]
+    for name in mismatches:
+        print(f"  ❌ specs differ for {name}")
+
+    before = time_per_doc(lambda t, n: reference_parse_specs(t, n, extractor.PATTERNS), docs, args.rounds)
+    after = time_per_doc(extractor.parse_specs, docs, args.rounds)
+    print(f"  before : {before * 1e3:.3f} ms/doc")
+    print(f"  after  : {after * 1e3:.3f} ms/doc  (x{before / after:.1f})")
+    print_passes(docs, max(1, args.rounds // 10))
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
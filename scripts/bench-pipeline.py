@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+bench-pipeline.py — Benchmark suite for the datasheet & catalog pipeline.
+
+Stages (each run in a fresh process so peak RSS is per stage):
+  extract  specs_extractor over public/datasheets/*.pdf, with accuracy
+           against scripts/bench/golden-specs.json
+  enrich   enrich_product() from enrich-datasheets.py (URL guess + local
+           DatasheetResolver lookup) over the catalog
+  match    FamilyMatcher (family_matcher.py) over the catalog with the
+           MODEL_FAMILIES of scrape-product-images.py
+
+Only the stage's work is timed: script imports, catalog loading and index
+building happen before the clock starts.
+
+Reports wall time, CPU time, peak RSS and docs/sec or SKUs/sec per stage,
+writes the results as JSON and compares them with a saved baseline: any
+slowdown beyond --tolerance, accuracy drop or failed stage exits with
+status 1. A stage is only skipped when an optional dependency (PyMuPDF)
+is not installed.
+
+Usage:
+  python3 scripts/bench-pipeline.py                    # run + compare
+  python3 scripts/bench-pipeline.py --save-baseline    # run + store baseline
+  python3 scripts/bench-pipeline.py --stages extract --repeat 5
+"""
+
+import argparse
+import datetime
+import importlib.util
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+from pathlib import Path
+from queue import Empty
+
+from catalog import load_catalog
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+DATASHEETS_DIR = PROJECT_DIR / "public" / "datasheets"
+CATALOG_FILE = PROJECT_DIR / "public" / "data" / "products.json"
+GOLDEN_FILE = SCRIPT_DIR / "bench" / "golden-specs.json"
+RESULTS_DIR = PROJECT_DIR / ".cache" / "bench"
+
+STAGES = ("extract", "enrich", "match")
+
+
+def load_script(filename, name):
+    """Import one of the hyphenated pipeline scripts as a module."""
+    spec = importlib.util.spec_from_file_location(name, SCRIPT_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def cpu_seconds():
+    """CPU time of this process plus its (pool) children."""
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+# ═══════════════════════════════════════════════════════════════
+# STAGES — each returns (item count, extra metrics)
+# ═══════════════════════════════════════════════════════════════
+
+def score_accuracy(records, golden):
+    """Field-level exact-match accuracy of extracted records vs the golden set."""
+    total = matched = 0
+    misses = []
+    for rel, expected in golden.items():
+        got = records.get(rel)
+        fields = {"category": expected["category"], **expected["specs"]}
+        actual = {"category": got["category"], **got["specs"]} if got else {}
+        for field, value in fields.items():
+            total += 1
+            if actual.get(field) == value:
+                matched += 1
+            else:
+                misses.append(f"{rel}: {field} = {actual.get(field)!r}, expected {value!r}")
+    return {
+        "accuracy": round(matched / total, 4) if total else None,
+        "fields_checked": total,
+        "misses": misses,
+    }
+
+
+def stage_extract(args):
+    sys.path.insert(0, str(SCRIPT_DIR))
+    import specs_extractor
+    # PyMuPDF is only imported on the first PDF: missing, every PDF would just error
+    if importlib.util.find_spec("fitz") is None:
+        raise ModuleNotFoundError("No module named 'fitz'", name="fitz")
+
+    pdfs = sorted(DATASHEETS_DIR.rglob("*.pdf"))
+    with open(GOLDEN_FILE, encoding="utf-8") as f:
+        golden = json.load(f)
+
+    def run():
+        records = {}
+        errors = 0
+        for res in specs_extractor.extract_corpus(pdfs, jobs=args.jobs):
+            if "error" in res:
+                errors += 1
+                continue
+            records[Path(res["file"]).relative_to(DATASHEETS_DIR).as_posix()] = res["output"]
+        return len(pdfs), {"errors": errors, **score_accuracy(records, golden)}
+    return run
+
+
+def stage_enrich(args):
+    enrich = load_script("enrich-datasheets.py", "enrich_datasheets")
+    resolver = enrich.DatasheetResolver()
+    # Raw records: enrich_product() sets fields on them
+    with open(args.catalog, encoding="utf-8") as f:
+        catalog = json.load(f)
+
+    def run():
+        outcomes = {}
+        for p in catalog:
+            outcome = enrich.enrich_product(p, resolver)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        return len(catalog), {"outcomes": outcomes, "pdfs_indexed": resolver.files}
+    return run
+
+
+def stage_match(args):
+    scraper = load_script("scrape-product-images.py", "scrape_product_images")
+    catalog = load_catalog(args.catalog)
+
+    def run():
+        # Same call as scrape-product-images.py main()
+        groups = scraper.FamilyMatcher(scraper.MODEL_FAMILIES).group(catalog)
+        return len(catalog), {"matched": len(groups.sku_to_family), "overlaps": len(groups.overlaps)}
+    return run
+
+
+# Each stage function does its imports and loading, then returns the
+# callable that is timed.
+STAGE_FUNCS = {"extract": stage_extract, "enrich": stage_enrich, "match": stage_match}
+UNITS = {"extract": "docs", "enrich": "skus", "match": "skus"}
+# Missing optional modules skip a stage; any other error fails the run
+OPTIONAL_DEPS = {"fitz": "PyMuPDF"}
+
+
+def run_stage(name, args, queue):
+    """Child process body: run one stage and report its metrics."""
+    try:
+        run = STAGE_FUNCS[name](args)
+        wall0, cpu0 = time.perf_counter(), cpu_seconds()
+        items, extra = run()
+        wall, cpu = time.perf_counter() - wall0, cpu_seconds() - cpu0
+        queue.put({
+            "items": items,
+            "wall_s": round(wall, 4),
+            "cpu_s": round(cpu, 4),
+            "peak_rss_mb": peak_rss_mb(),
+            f"{UNITS[name]}_per_s": round(items / wall, 1) if wall else None,
+            **extra,
+        })
+    except ModuleNotFoundError as e:
+        if e.name in OPTIONAL_DEPS:
+            queue.put({"skipped": f"{OPTIONAL_DEPS[e.name]} not installed"})
+        else:
+            queue.put({"failed": f"{type(e).__name__}: {e}"})
+    except Exception as e:
+        queue.put({"failed": f"{type(e).__name__}: {e}"})
+
+
+def measure(name, args):
+    """Best-of-N wall/CPU time, worst peak RSS, each run in a fresh process."""
+    ctx = multiprocessing.get_context("spawn")
+    best = None
+    for _ in range(args.repeat):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_stage, args=(name, args, queue))
+        proc.start()
+        result = None
+        while result is None:
+            try:
+                result = queue.get(timeout=1)
+            except Empty:
+                if not proc.is_alive():
+                    result = {"failed": f"stage process died (exit code {proc.exitcode})"}
+        proc.join()
+        if "skipped" in result or "failed" in result:
+            return result
+        if best is None or result["wall_s"] < best["wall_s"]:
+            rss = max(result["peak_rss_mb"], best["peak_rss_mb"]) if best else result["peak_rss_mb"]
+            best = {**result, "peak_rss_mb": rss}
+        else:
+            best["peak_rss_mb"] = max(best["peak_rss_mb"], result["peak_rss_mb"])
+    return best
+
+
+# ═══════════════════════════════════════════════════════════════
+# BASELINE COMPARISON
+# ═══════════════════════════════════════════════════════════════
+
+def compare(results, baseline, tolerance):
+    """Return human-readable regressions of results vs baseline."""
+    regressions = [f"{name}: failed — {cur['failed']}" for name, cur in results["stages"].items() if "failed" in cur]
+    for name, cur in results["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base or "failed" in cur or "skipped" in cur or "skipped" in base or "failed" in base:
+            continue
+        limit = base["wall_s"] * (1 + tolerance)
+        if cur["wall_s"] > limit:
+            regressions.append(
+                f"{name}: wall {cur['wall_s']:.3f}s > {limit:.3f}s "
+                f"(baseline {base['wall_s']:.3f}s +{tolerance:.0%})"
+            )
+        if base.get("accuracy") is not None and (cur.get("accuracy") or 0) < base["accuracy"]:
+            regressions.append(f"{name}: accuracy {cur.get('accuracy')} < baseline {base['accuracy']}")
+        if cur.get("errors", 0) > base.get("errors", 0):
+            regressions.append(f"{name}: errors {cur['errors']} > baseline {base['errors']}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the datasheet & catalog pipeline")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--catalog", default=str(CATALOG_FILE), help="Catalog JSON for enrich/match")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes for the extract stage")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage, best wall time kept")
+    parser.add_argument("--output", default=str(RESULTS_DIR / "latest.json"))
+    parser.add_argument("--baseline", default=str(RESULTS_DIR / "baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed wall-time slowdown vs baseline (default: 0.25 = +25%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("⏱️  SUNTREX pipeline benchmark")
+    print("=" * 60)
+    results = {
+        "generated_at": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "stages": {},
+    }
+    for name in args.stages:
+        metrics = measure(name, args)
+        results["stages"][name] = metrics
+        if "skipped" in metrics:
+            print(f"  ⚠️  {name:8} skipped — {metrics['skipped']}")
+            continue
+        if "failed" in metrics:
+            print(f"  ❌ {name:8} FAILED — {metrics['failed']}")
+            continue
+        rate = metrics[f"{UNITS[name]}_per_s"]
+        line = (f"  {name:8} {metrics['items']:5} {UNITS[name]:4}  wall {metrics['wall_s']:.3f}s  "
+                f"cpu {metrics['cpu_s']:.3f}s  rss {metrics['peak_rss_mb']} MB  {rate} {UNITS[name]}/s")
+        if metrics.get("accuracy") is not None:
+            line += f"  accuracy {metrics['accuracy']:.1%}"
+        print(line)
+        for miss in metrics.get("misses", []):
+            print(f"      ✗ {miss}")
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\n  📄 Results: {output}")
+
+    failed = [name for name, metrics in results["stages"].items() if "failed" in metrics]
+    baseline_path = Path(args.baseline)
+    if failed:
+        # Never saved as a baseline, never compared as "no regression"
+        print(f"\n  ❌ Stage(s) failed: {', '.join(failed)}")
+        return 1
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"  💾 Baseline saved: {baseline_path}")
+        return 0
+
+    if not baseline_path.exists():
+        print(f"  ℹ️  No baseline at {baseline_path} (run with --save-baseline)")
+        return 0
+
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{'!' * 60}")
+        print("  ❌ REGRESSION vs baseline")
+        for r in regressions:
+            print(f"    - {r}")
+        print(f"{'!' * 60}")
+        return 1
+    print("  ✅ No regression vs baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
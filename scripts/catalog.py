@@ -0,0 +1,273 @@
+"""Shared catalog loader for the Python scripts.
+
+The scripts read three catalog files, each with its own conventions:
+
+  zoho      src/data/zoho-products.json   Zoho export (brand "HUAWEI", category "cables")
+  products  public/data/products.json     storefront data ("Huawei" and "HUAWEI", "electrical")
+  suntrex   suntrex-catalog.json          scraper input ("solar_panels", "micro_inverters")
+
+load_catalog() reads any of them into the same compact records (Product,
+``__slots__``): brand spellings are unified (brand_key is the upper-cased
+form, brand the canonical spelling) and categories are mapped onto the
+storefront vocabulary (src/products.js CATEGORIES), the original category
+being kept as raw_category. Fields without a slot (specs, seller, icon...)
+are kept as is in ``extra``. Records also answer ``p["sku"]`` /
+``p.get("power")`` so code written for the JSON dicts keeps working.
+
+Parsing JSON is the slow part, so the records are cached as a binary
+snapshot in .cache/catalog/, keyed by the source file: a snapshot is used
+as is while the file's mtime and size are unchanged, and after a touch
+(new mtime) as long as its SHA-256 still matches. A snapshot written by
+another version of this module (other slots or normalisation tables), or
+one that cannot be read, is ignored: the JSON is parsed again and the
+snapshot rewritten.
+
+Usage: python3 scripts/catalog.py [zoho|products|suntrex|path.json]   (stats + load times)
+"""
+
+import hashlib
+import json
+import pickle
+import sys
+import time
+from pathlib import Path
+
+from atomic_file import AtomicFile
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+SNAPSHOT_DIR = REPO_DIR / ".cache" / "catalog"
+SNAPSHOT_FORMAT = 2  # bump when the snapshot layout changes
+
+SOURCES = {
+    "zoho": [REPO_DIR / "src" / "data" / "zoho-products.json"],
+    "products": [REPO_DIR / "public" / "data" / "products.json"],
+    "suntrex": [REPO_DIR / "suntrex-catalog.json",
+                Path.home() / "Downloads" / "suntrex" / "suntrex-catalog.json"],
+}
+
+# Upper-cased brand → canonical spelling, where the sources disagree
+BRAND_NAMES = {
+    "HUAWEI": "HUAWEI",
+    "ENPHASE": "Enphase",
+    "AP SYSTEMS": "AP Systems",
+    "APSYSTEMS": "AP Systems",
+    "SOLAREDGE": "SolarEdge",
+}
+
+# Source category → storefront category (src/products.js CATEGORIES)
+CATEGORIES = ("panels", "inverters", "batteries", "electrical", "mounting", "optimizers", "ev-chargers", "accessories")
+CATEGORY_ALIASES = {
+    "solar_panels": "panels",
+    "solar-panels": "panels",
+    "micro_inverters": "inverters",
+    "micro-inverters": "inverters",
+    "batteries_accessories": "batteries",
+    "cables": "electrical",
+    "ev_charging": "ev-chargers",
+    "ev-charging": "ev-chargers",
+    "monitoring": "accessories",
+}
+
+
+def brand_key(brand):
+    return " ".join((brand or "").upper().split())
+
+
+def normalize_brand(brand):
+    key = brand_key(brand)
+    return BRAND_NAMES.get(key, " ".join((brand or "").split()))
+
+
+def normalize_category(category):
+    category = (category or "").strip().lower()
+    category = CATEGORY_ALIASES.get(category, category.replace("_", "-"))
+    return category if category in CATEGORIES else "accessories"
+
+
+class Product:
+    """One catalog entry, normalised. Source fields without a slot are kept in extra."""
+
+    __slots__ = ("id", "sku", "name", "brand", "brand_key", "category", "raw_category",
+                 "subcategory", "description", "datasheet", "image", "price", "stock", "power_kw", "extra")
+
+    # JSON field name → attribute, for p["powerKw"] style access
+    KEYS = {"powerKw": "power_kw"}
+    FIELDS = {"id", "sku", "name", "brand", "category", "subcategory", "description",
+              "datasheet", "image", "price", "stock", "powerKw"}
+
+    def __init__(self, id, sku, name, brand, brand_key, category, raw_category,
+                 subcategory, description, datasheet, image, price, stock, power_kw, extra=None):
+        self.id = id
+        self.sku = sku
+        self.name = name
+        self.brand = brand
+        self.brand_key = brand_key
+        self.category = category
+        self.raw_category = raw_category
+        self.subcategory = subcategory
+        self.description = description
+        self.datasheet = datasheet
+        self.image = image
+        self.price = price
+        self.stock = stock
+        self.power_kw = power_kw
+        self.extra = extra  # {field: value} for the source fields above don't cover, or None
+
+    @classmethod
+    def from_json(cls, record):
+        brand = normalize_brand(record.get("brand"))
+        return cls(
+            record.get("id"),
+            (record.get("sku") or "").strip(),
+            record.get("name") or "",
+            brand,
+            brand_key(brand),
+            normalize_category(record.get("category")),
+            record.get("category"),
+            record.get("subcategory"),
+            record.get("description") or "",
+            record.get("datasheet"),
+            record.get("image"),
+            record.get("price"),
+            record.get("stock"),
+            record.get("powerKw"),
+            {k: v for k, v in record.items() if k not in cls.FIELDS} or None,
+        )
+
+    def astuple(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __getitem__(self, key):
+        name = self.KEYS.get(key, key)
+        if name in self.__slots__ and name != "extra":
+            return getattr(self, name)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def __repr__(self):
+        return f"Product({self.sku!r}, {self.brand!r}, {self.category!r})"
+
+
+def _snapshot_version():
+    """Changes with the record layout and the normalisation tables."""
+    tables = [SNAPSHOT_FORMAT, Product.__slots__, BRAND_NAMES, CATEGORY_ALIASES, CATEGORIES]
+    return hashlib.sha256(json.dumps(tables, sort_keys=True).encode()).hexdigest()[:16]
+
+
+SNAPSHOT_VERSION = _snapshot_version()
+
+
+def source_path(source):
+    """Path of a named source (first existing candidate), or source itself as a path."""
+    candidates = SOURCES.get(source)
+    if candidates is None:
+        return Path(source)
+    for path in candidates:
+        if path.exists():
+            return path
+    return candidates[0]
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def snapshot_path(path):
+    key = hashlib.sha256(str(Path(path).resolve()).encode()).hexdigest()[:16]
+    return SNAPSHOT_DIR / f"{Path(path).stem}-{key}.pickle"
+
+
+def _read_snapshot(snap, st, path):
+    """Rows from a snapshot still valid for the source, else None."""
+    try:
+        with open(snap, "rb") as f:
+            header = pickle.load(f)
+            if not isinstance(header, dict):
+                return None
+            if header.get("version") != SNAPSHOT_VERSION or header.get("size") != st.st_size:
+                return None
+            if header.get("mtime_ns") != st.st_mtime_ns:
+                # Touched (checkout, copy): still valid if the content is the same
+                if header.get("sha256") != _sha256(path):
+                    return None
+                rows = pickle.load(f)
+                _write_snapshot(snap, st, header["sha256"], rows)
+                return rows
+            return pickle.load(f)
+    except Exception:
+        # Truncated, corrupt or foreign file: it is only a cache, parse the JSON
+        return None
+
+
+def _write_snapshot(snap, st, sha, rows):
+    header = {"version": SNAPSHOT_VERSION, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha}
+    with AtomicFile(snap, "wb") as f:
+        pickle.dump(header, f.file, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(rows, f.file, protocol=pickle.HIGHEST_PROTOCOL)
+        f.commit()
+
+
+def load_catalog(source, snapshot=True):
+    """[Product, ...] for a source name ("zoho", "products", "suntrex") or a JSON path.
+
+    The records are for reading: brands and categories are normalised
+    (a category outside the storefront vocabulary becomes "accessories",
+    raw_category keeps the original) and fields without a slot are only
+    kept in ``extra``. Scripts that rewrite a catalog file stream the raw
+    JSON instead (json_stream) or go through catalog_store.
+    """
+    path = source_path(source)
+    st = path.stat()
+    snap = snapshot_path(path)
+    rows = _read_snapshot(snap, st, path) if snapshot else None
+    if rows is not None:
+        try:
+            return [Product(*row) for row in rows]
+        except (TypeError, ValueError):
+            rows = None  # rows of another layout despite the version check
+    if rows is None:
+        with open(path, encoding="utf-8") as f:
+            records = json.load(f)
+        rows = [Product.from_json(record).astuple() for record in records]
+        if snapshot:
+            _write_snapshot(snap, st, _sha256(path), rows)
+    return [Product(*row) for row in rows]
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    for source in argv or list(SOURCES):
+        path = source_path(source)
+        if not path.exists():
+            print(f"❓ {source}: {path} not found")
+            continue
+        t = time.perf_counter()
+        load_catalog(source, snapshot=False)
+        parse_ms = (time.perf_counter() - t) * 1000
+        load_catalog(source)
+        t = time.perf_counter()
+        products = load_catalog(source)
+        snap_ms = (time.perf_counter() - t) * 1000
+        brands = {p.brand_key for p in products}
+        categories = {}
+        for p in products:
+            categories[p.category] = categories.get(p.category, 0) + 1
+        print(f"📦 {source}: {len(products)} products, {len(brands)} brands — "
+              f"JSON {parse_ms:.1f} ms, snapshot {snap_ms:.1f} ms ({path})")
+        print("   " + ", ".join(f"{c} {n}" for c, n in sorted(categories.items(), key=lambda x: -x[1])))
+
+
+if __name__ == "__main__":
+    main()
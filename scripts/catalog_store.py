@@ -0,0 +1,378 @@
+"""Optional SQLite store behind the catalog JSON files.
+
+Pipeline steps that only touch a few fields of a few products (datasheet
+links, family, image) would otherwise each load, scan and rewrite a whole
+JSON file, and two of them running at once would overwrite each other's
+rewrite. With the store they update rows instead:
+
+  products(source, pos, sku, brand_key, category, family, data, updated_at, updated_by)
+
+- ``data`` is the product record as found in the JSON file, untouched, so an
+  export reproduces the file (same field order, same layout as json_stream).
+- ``sku``, ``brand_key``, ``category`` (catalog.py vocabulary) and
+  ``family`` are indexed columns, kept in sync with ``data`` on every write.
+  ``family`` is pipeline metadata (scraper model family), not exported.
+- update() merges fields into the rows of the given SKUs in one
+  ``BEGIN IMMEDIATE`` transaction: concurrent steps are serialised by
+  SQLite (WAL, busy timeout) and each only rewrites the fields it sets, so
+  enrichment writing ``datasheet`` and the scraper writing ``image`` both land.
+- export() writes a source back to its JSON file (atomic), only when rows
+  changed since the last import/export. The file's size, mtime and SHA-256
+  are recorded at import and export; if the file was changed since by
+  something other than the store (mirror-datasheets.py without --store, a
+  manual edit), export() raises SourceChanged instead of overwriting it.
+
+    store = CatalogStore()
+    store.refresh("zoho")          # import if missing or changed on disk
+    store.update("zoho", {"HUA/SUN2000-8K-LC0": {"datasheet": "/datasheets/..."}}, step="enrich")
+    store.export("zoho")
+
+Usage: python3 scripts/catalog_store.py import|export|stats [zoho|products|suntrex ...] [--force]
+       python3 scripts/catalog_store.py get SKU [--source zoho]
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+from catalog import REPO_DIR, SOURCES, brand_key, normalize_brand, normalize_category, source_path
+from json_stream import JsonArrayWriter, iter_json_array
+
+STORE_FILE = REPO_DIR / ".cache" / "catalog.sqlite"
+BUSY_TIMEOUT = 30  # seconds a step waits for another step's transaction
+SQL_CHUNK = 500  # SKUs per "IN (...)" query (SQLite caps bound parameters)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    source     TEXT NOT NULL,
+    pos        INTEGER NOT NULL,          -- index in the JSON array (export order)
+    sku        TEXT NOT NULL,
+    brand_key  TEXT NOT NULL,
+    category   TEXT NOT NULL,
+    family     TEXT,
+    data       TEXT NOT NULL,             -- JSON record, as in the source file
+    updated_at REAL,
+    updated_by TEXT,
+    PRIMARY KEY (source, pos)
+);
+CREATE INDEX IF NOT EXISTS products_sku ON products (source, sku);
+CREATE INDEX IF NOT EXISTS products_brand ON products (source, brand_key);
+CREATE INDEX IF NOT EXISTS products_category ON products (source, category);
+CREATE INDEX IF NOT EXISTS products_family ON products (source, family);
+CREATE TABLE IF NOT EXISTS sources (
+    source    TEXT PRIMARY KEY,
+    path      TEXT NOT NULL,
+    version   INTEGER NOT NULL DEFAULT 0,  -- bumped by every update
+    exported  INTEGER NOT NULL DEFAULT 0,  -- version last written to path
+    size      INTEGER,                     -- path as last imported / exported
+    mtime_ns  INTEGER,
+    sha256    TEXT
+);
+"""
+# Columns added to an existing store file since its creation
+MIGRATIONS = {"sources": [("size", "INTEGER"), ("mtime_ns", "INTEGER"), ("sha256", "TEXT")]}
+
+
+class UnexportedChanges(RuntimeError):
+    """import_json() would drop updates that were never exported."""
+
+
+class SourceChanged(RuntimeError):
+    """export() would overwrite changes made to the JSON file outside the store."""
+
+
+def _fingerprint(path):
+    """(size, mtime_ns, sha256) of a file."""
+    st = Path(path).stat()
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return st.st_size, st.st_mtime_ns, h.hexdigest()
+
+
+def _columns(record):
+    """Indexed column values (sku, brand_key, category) of a JSON record."""
+    return (
+        (record.get("sku") or "").strip(),
+        brand_key(normalize_brand(record.get("brand"))),
+        normalize_category(record.get("category")),
+    )
+
+
+class CatalogStore:
+    def __init__(self, path=STORE_FILE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly (BEGIN IMMEDIATE)
+        self.db = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        for table, columns in MIGRATIONS.items():
+            existing = {row[1] for row in self.db.execute(f"PRAGMA table_info({table})")}
+            for name, kind in columns:
+                if name not in existing:
+                    self.db.execute(f"ALTER TABLE {table} ADD COLUMN {name} {kind}")
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _transaction(self, mode="IMMEDIATE"):
+        return _Transaction(self.db, mode)
+
+    # ── Loading / exporting ────────────────────────────────────
+
+    def import_json(self, source, path=None, force=False):
+        """Replace a source's rows with the content of its JSON file. Returns the row count."""
+        path = Path(path) if path else source_path(source)
+        now = time.time()
+        size, mtime_ns, sha = _fingerprint(path)
+        with self._transaction():
+            row = self.db.execute("SELECT version, exported FROM sources WHERE source = ?", (source,)).fetchone()
+            if row and row[0] != row[1] and not force:
+                raise UnexportedChanges(f"{source}: {row[0] - row[1]} updates not exported yet (export first or force)")
+            families = dict(self.db.execute(
+                "SELECT sku, family FROM products WHERE source = ? AND family IS NOT NULL", (source,)))
+            self.db.execute("DELETE FROM products WHERE source = ?", (source,))
+            count = 0
+            with open(path, encoding="utf-8") as f:
+                for pos, record in enumerate(iter_json_array(f)):
+                    sku, brand, category = _columns(record)
+                    self.db.execute(
+                        "INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (source, pos, sku, brand, category, families.get(sku),
+                         json.dumps(record, ensure_ascii=False), now, "import"),
+                    )
+                    count += 1
+            self.db.execute(
+                "INSERT INTO sources (source, path, version, exported, size, mtime_ns, sha256) "
+                "VALUES (?, ?, 0, 0, ?, ?, ?) "
+                "ON CONFLICT (source) DO UPDATE SET path = excluded.path, version = 0, exported = 0, "
+                "size = excluded.size, mtime_ns = excluded.mtime_ns, sha256 = excluded.sha256",
+                (source, str(Path(path).resolve()), size, mtime_ns, sha),
+            )
+        return count
+
+    def refresh(self, source, path=None):
+        """Import a source if it was never imported or its file changed since.
+
+        Steps call this before reading the store, so they start from the
+        file's current content. Raises UnexportedChanges when the file
+        changed while store updates were still pending (both sides changed).
+        Returns the row count imported, or None if the store was up to date.
+        """
+        known = self.db.execute("SELECT 1 FROM sources WHERE source = ?", (source,)).fetchone()
+        if known and not self.source_changed(source):
+            return None
+        return self.import_json(source, path)
+
+    def source_changed(self, source):
+        """True if the source's JSON file differs from what was last imported / exported."""
+        row = self.db.execute(
+            "SELECT path, size, mtime_ns, sha256 FROM sources WHERE source = ?", (source,)).fetchone()
+        if row is None:
+            return False
+        path = Path(row[0])
+        if not path.exists():
+            return False
+        if row[3] is None:
+            return True  # imported before fingerprints were recorded: can't tell, assume changed
+        st = path.stat()
+        if st.st_size != row[1]:
+            return True
+        # Touched (checkout, copy) but same content: not a change
+        return st.st_mtime_ns != row[2] and _fingerprint(path)[2] != row[3]
+
+    def export(self, source, path=None, force=False):
+        """Write a source back to its JSON file; False if nothing changed since the last export.
+
+        Raises SourceChanged if the file was modified outside the store since
+        the last import / export (re-import it, or force to overwrite).
+        """
+        row = self.db.execute("SELECT path, version, exported FROM sources WHERE source = ?", (source,)).fetchone()
+        if row is None:
+            raise KeyError(f"{source} was never imported")
+        recorded = Path(row[0])
+        target = Path(path) if path else recorded
+        if row[1] == row[2] and not force and target.exists():
+            return False
+        if not force and target.resolve() == recorded and self.source_changed(source):
+            raise SourceChanged(f"{source}: {target} changed since the last import/export "
+                                f"(re-import it, or force to overwrite)")
+        # One read transaction: a consistent snapshot even while other steps write
+        with self._transaction(mode="DEFERRED"), JsonArrayWriter(target) as out:
+            version = self.db.execute("SELECT version FROM sources WHERE source = ?", (source,)).fetchone()[0]
+            for (data,) in self.db.execute("SELECT data FROM products WHERE source = ? ORDER BY pos", (source,)):
+                out.write(json.loads(data))
+            out.commit()
+        size, mtime_ns, sha = _fingerprint(target)
+        with self._transaction():
+            if target.resolve() == recorded:
+                self.db.execute("UPDATE sources SET exported = ?, size = ?, mtime_ns = ?, sha256 = ? "
+                                "WHERE source = ?", (version, size, mtime_ns, sha, source))
+            else:
+                self.db.execute("UPDATE sources SET exported = ? WHERE source = ?", (version, source))
+        return True
+
+    # ── Queries ────────────────────────────────────────────────
+
+    def _select(self, source, where="", params=()):
+        sql = "SELECT data FROM products WHERE source = ?" + (f" AND {where}" if where else "") + " ORDER BY pos"
+        return [json.loads(data) for (data,) in self.db.execute(sql, (source, *params))]
+
+    def get(self, source, sku):
+        """Product record for sku (the first one if the SKU is listed twice), or None."""
+        found = self._select(source, "sku = ?", ((sku or "").strip(),))
+        return found[0] if found else None
+
+    def products(self, source):
+        return self._select(source)
+
+    def by_brand(self, source, brand):
+        return self._select(source, "brand_key = ?", (brand_key(normalize_brand(brand)),))
+
+    def by_category(self, source, category):
+        return self._select(source, "category = ?", (normalize_category(category),))
+
+    def by_family(self, source, family):
+        return self._select(source, "family = ?", (family,))
+
+    def families(self, source):
+        """SKU → family for the SKUs a step has assigned one."""
+        return dict(self.db.execute(
+            "SELECT sku, family FROM products WHERE source = ? AND family IS NOT NULL", (source,)))
+
+    # ── Partial updates ────────────────────────────────────────
+
+    def update(self, source, changes, step=None):
+        """Merge {sku: {field: value}} into the products, in one transaction.
+
+        A value of None removes the field. Only the given fields are written:
+        fields other steps changed in the meantime are kept. Returns the
+        number of rows changed (SKUs not in the catalog are ignored).
+        """
+        now = time.time()
+        skus = list(changes)
+        with self._transaction():
+            # One query per chunk of SKUs, one executemany for the writes: the
+            # write lock is held for as little time as possible
+            rows = []
+            for i in range(0, len(skus), SQL_CHUNK):
+                chunk = skus[i:i + SQL_CHUNK]
+                rows += self.db.execute(
+                    f"SELECT pos, sku, data FROM products WHERE source = ? AND sku IN ({','.join('?' * len(chunk))})",
+                    (source, *chunk)).fetchall()
+            writes = []
+            for pos, sku, data in rows:
+                record = json.loads(data)
+                merged = dict(record)
+                for field, value in changes[sku].items():
+                    if value is None:
+                        merged.pop(field, None)
+                    else:
+                        merged[field] = value
+                if merged == record:
+                    continue
+                sku_col, brand, category = _columns(merged)
+                writes.append((sku_col, brand, category, json.dumps(merged, ensure_ascii=False), now, step, source, pos))
+            self.db.executemany(
+                "UPDATE products SET sku = ?, brand_key = ?, category = ?, data = ?, "
+                "updated_at = ?, updated_by = ? WHERE source = ? AND pos = ?", writes)
+            if writes:
+                self.db.execute("UPDATE sources SET version = version + 1 WHERE source = ?", (source,))
+        return len(writes)
+
+    def set_families(self, source, sku_to_family, step=None):
+        """Record the model family of each SKU (pipeline metadata, not exported)."""
+        now = time.time()
+        rows = [(family, now, step, source, sku) for sku, family in sku_to_family.items()]
+        with self._transaction():
+            self.db.executemany(
+                "UPDATE products SET family = ?, updated_at = ?, updated_by = ? WHERE source = ? AND sku = ?", rows)
+
+    def stats(self, source):
+        row = self.db.execute("SELECT version, exported, path FROM sources WHERE source = ?", (source,)).fetchone()
+        if row is None:
+            return None
+        count, brands, categories, families = self.db.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT brand_key), COUNT(DISTINCT category), COUNT(DISTINCT family) "
+            "FROM products WHERE source = ?", (source,)).fetchone()
+        return {"products": count, "brands": brands, "categories": categories, "families": families,
+                "pending": row[0] - row[1], "path": row[2], "changed": self.source_changed(source)}
+
+
+class _Transaction:
+    """BEGIN ... COMMIT / ROLLBACK around a block (IMMEDIATE: write lock up front)."""
+
+    def __init__(self, db, mode="IMMEDIATE"):
+        self.db = db
+        self.mode = mode
+
+    def __enter__(self):
+        self.db.execute(f"BEGIN {self.mode}")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SQLite catalog store (import / export / query)")
+    parser.add_argument("command", choices=("import", "export", "stats", "get"))
+    parser.add_argument("args", nargs="*", help="Sources (default: all), or the SKU for get")
+    parser.add_argument("--source", default="zoho", help="Source for get (default: zoho)")
+    parser.add_argument("--store", type=Path, default=STORE_FILE, help=f"Store file (default: {STORE_FILE})")
+    parser.add_argument("--force", action="store_true",
+                        help="Import over unexported updates / export unchanged or externally modified sources")
+    args = parser.parse_args(argv)
+
+    with CatalogStore(args.store) as store:
+        if args.command == "get":
+            for sku in args.args:
+                print(json.dumps(store.get(args.source, sku), ensure_ascii=False, indent=2))
+            return 0
+        for source in args.args or list(SOURCES):
+            if args.command == "import":
+                if not source_path(source).exists():
+                    print(f"❓ {source}: {source_path(source)} not found")
+                    continue
+                try:
+                    count = store.import_json(source, force=args.force)
+                except UnexportedChanges as e:
+                    print(f"⚠️  {e}")
+                    continue
+                print(f"📥 {source}: {count} products imported")
+            elif args.command == "export":
+                try:
+                    written = store.export(source, force=args.force)
+                except SourceChanged as e:
+                    print(f"⚠️  {e}")
+                    continue
+                print(f"📤 {source}: {'exported' if written else 'unchanged, not rewritten'}")
+            else:
+                info = store.stats(source)
+                if info is None:
+                    print(f"❓ {source}: not imported")
+                    continue
+                print(f"📦 {source}: {info['products']} products, {info['brands']} brands, "
+                      f"{info['categories']} categories, {info['families']} families, "
+                      f"{info['pending']} updates not exported ({info['path']})")
+                if info["changed"]:
+                    print(f"   ⚠️  {info['path']} changed since the last import/export")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
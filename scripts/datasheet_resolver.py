@@ -0,0 +1,130 @@
+"""Resolve catalog SKUs to the datasheet PDFs we host under public/datasheets/.
+
+File names and SKUs are spelled differently (``HUA/SUN2000-8K-LC0`` vs
+``sun2000-8k-10k-lc0.pdf``, ``HUA/BAT-LUNA2000-5-E0`` vs
+``huawei/luna2000-5-e0-datasheet.pdf``), so both are normalised to lower-case
+tokens (``,`` as decimal point, descriptor words such as ``datasheet`` or
+``series`` dropped) and the datasheet tree is indexed once under three keys:
+
+- exact:  every token, separators ignored       sun20005kmap0 (SDongleA-05 = sdongle-a05)
+- range:  ratings collapsed to "#", with the    sun2000-#-lc0 → 8k..10k
+          min..max rating they cover
+- series: ratings dropped                       sun2000-map0
+
+A SKU is looked up in that order (first for its model, then with
+leading words such as ``BAT-`` or trailing ones such as ``-EU`` dropped),
+each step a handful of dict lookups, so resolving is near-constant time
+per SKU whatever the size of the tree.
+Files in the brand's own folder win over same-named files elsewhere.
+"""
+
+import re
+from pathlib import Path
+
+DATASHEETS_DIR = Path(__file__).resolve().parent.parent / "public" / "datasheets"
+
+DESCRIPTOR_WORDS = {"datasheet", "datasheets", "specs", "spec", "series", "fiche", "technique", "wifi"}
+BRAND_PREFIX_RE = re.compile(r'^[A-Za-z]{1,4}/')
+RATING_RE = re.compile(r'^(\d+(?:\.\d+)?)([a-z]{0,3})$')
+
+
+def tokens(text):
+    """Lower-case alphanumeric tokens, "3,6ktl" → "3.6ktl", descriptor words dropped."""
+    text = re.sub(r'(\d),(\d)', r'\1.\2', text.lower())
+    return [t for t in re.split(r'[^a-z0-9.]+', text) if t.strip(".") and t not in DESCRIPTOR_WORDS]
+
+
+def rating(token):
+    """(value, unit) for a rating token such as "8k", "3.6ktl" or "5", else None."""
+    m = RATING_RE.match(token)
+    return (float(m.group(1)), m.group(2)) if m else None
+
+
+def series_key(toks):
+    """Tokens with consecutive ratings collapsed to "#", plus the ratings."""
+    key, ratings = [], []
+    for t in toks:
+        r = rating(t)
+        if r:
+            ratings.append(r)
+            if not key or key[-1] != "#":
+                key.append("#")
+        else:
+            key.append(t)
+    return "-".join(key), ratings
+
+
+class DatasheetResolver:
+    def __init__(self, root=DATASHEETS_DIR):
+        self.root = Path(root)
+        self.exact = {}    # tokens joined without separators → [url, ...]
+        self.ranges = {}   # series key with "#" → [(unit, low, high, url), ...]
+        self.series = {}   # key without ratings → [url, ...]
+        self.files = 0
+        if self.root.is_dir():
+            for path in sorted(self.root.rglob("*.pdf")):
+                self.add(path)
+
+    def url_for(self, path):
+        return "/datasheets/" + Path(path).relative_to(self.root).as_posix()
+
+    def add(self, path):
+        toks = tokens(Path(path).stem)
+        if not toks:
+            return
+        url = self.url_for(path)
+        self.files += 1
+        self.exact.setdefault("".join(toks), []).append(url)
+        key, ratings = series_key(toks)
+        if ratings and len({unit for _, unit in ratings}) == 1:
+            values = [value for value, _ in ratings]
+            self.ranges.setdefault(key, []).append((ratings[0][1], min(values), max(values), url))
+        elif not ratings:
+            self.series.setdefault(key, []).append(url)
+
+    @staticmethod
+    def _pick(urls, brand_dir):
+        """First candidate in the brand's folder, else the first one."""
+        for url in urls:
+            if brand_dir and url.startswith(f"/datasheets/{brand_dir}/"):
+                return url
+        return urls[0]
+
+    def candidates(self, sku):
+        """Token lists to try for a SKU, most specific first.
+
+        The model (brand prefix such as ``HUA/`` removed, and each of its
+        space-separated words), then the same with up to two leading words
+        (``BAT-DC-``) and two trailing ones (``-EU``, ``-EU-SM2``) dropped.
+        """
+        model = BRAND_PREFIX_RE.sub("", sku.strip())
+        parts = [tokens(part) for part in [model, *model.split()]]
+        seen = []
+        for trim in range(5):
+            for toks in parts:
+                for start in range(min(trim, 2) + 1):
+                    end = len(toks) - (trim - start)
+                    if trim - start > 2 or end - start < (1 if trim == 0 else 2):
+                        continue
+                    rest = toks[start:end]
+                    if any(ch.isdigit() for t in rest for ch in t) and rest not in seen:
+                        seen.append(rest)
+        return seen
+
+    def resolve(self, sku, brand=None):
+        """Local URL (/datasheets/...) of the datasheet covering sku, or None."""
+        brand_dir = re.sub(r'[^a-z0-9]+', '-', (brand or "").lower()).strip("-")
+        for toks in self.candidates(sku):
+            urls = self.exact.get("".join(toks))
+            if urls:
+                return self._pick(urls, brand_dir)
+            key, ratings = series_key(toks)
+            if len(ratings) == 1:
+                value, unit = ratings[0]
+                urls = [url for u, low, high, url in self.ranges.get(key, ()) if u == unit and low <= value <= high]
+                if urls:
+                    return self._pick(urls, brand_dir)
+            urls = self.series.get("-".join(t for t in key.split("-") if t != "#"))
+            if urls:
+                return self._pick(urls, brand_dir)
+        return None
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+SUNTREX — Product image deduplication
+
+Finds duplicate images in public/products:
+  - exact duplicates (same SHA-256) are collapsed to one canonical file,
+    image-map.json is rewritten to point at it and the copies are deleted;
+  - near-duplicates (perceptual dHash within --max-distance bits, e.g. the
+    same photo re-encoded or resized) are only reported, in
+    public/products/DUPLICATE-IMAGES.md, for a human to decide.
+
+Files referenced from the frontend sources (src/**, "/products/..." paths)
+are never deleted and are preferred as the canonical copy.
+
+Run it after scrape-product-images.py (a later scrape re-renders the
+family images it manages, so run the dedupe again before deploying).
+
+Usage:
+  python3 scripts/dedupe-product-images.py [--dry-run] [--max-distance 6]
+
+Requirements:
+  pip3 install Pillow   (without it only exact duplicates are handled)
+"""
+
+import argparse
+import hashlib
+import json
+import re
+from collections import defaultdict
+from pathlib import Path
+
+from atomic_file import write_atomic
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+    print("⚠️  Pillow not installed. Only exact duplicates will be found. Run: pip3 install Pillow")
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+PRODUCTS_DIR = PROJECT_DIR / "public" / "products"
+SRC_DIR = PROJECT_DIR / "src"
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".avif", ".gif", ".svg"}
+RASTER_EXTENSIONS = IMAGE_EXTENSIONS - {".svg"}
+MAX_DISTANCE = 6  # dHash bits (out of 64) for two images to count as near-duplicates
+
+# Responsive ladder files written by the scraper (<family>-<width>.<sha8>.<ext>):
+# deduplicated exactly, but left out of the near-duplicate report since every
+# rung of a ladder looks like its siblings.
+LADDER_RE = re.compile(r'-\d+\.[0-9a-f]{8}\.(webp|avif)$')
+
+
+# ═══════════════════════════════════════════════════════════════
+# HASHES
+# ═══════════════════════════════════════════════════════════════
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def dhash(path, size=8):
+    """64-bit difference hash: robust to resizing, re-encoding and small edits."""
+    with Image.open(path) as img:
+        if img.format == "JPEG":
+            img.draft("L", (size * 4, size * 4))
+        if img.mode in ("P", "PA"):
+            img = img.convert("RGBA")
+        gray = img.convert("L").resize((size + 1, size), Image.LANCZOS)
+    pixels = gray.tobytes()
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+def near_duplicate_pairs(hashes, max_distance):
+    """Pairs of paths whose dHashes differ by at most max_distance bits.
+
+    Pigeonhole banding: split the 64 bits into max_distance + 1 bands; two
+    hashes within max_distance must agree on at least one whole band, so only
+    paths sharing a band value are compared (no all-pairs scan).
+    """
+    bands = max_distance + 1
+    width = -(-64 // bands)
+    mask = (1 << width) - 1
+    buckets = defaultdict(list)
+    for path, h in hashes.items():
+        for band in range(bands):
+            buckets[(band, (h >> (band * width)) & mask)].append(path)
+
+    pairs = {}
+    for paths in buckets.values():
+        for i, a in enumerate(paths):
+            for b in paths[i + 1:]:
+                key = (a, b) if a < b else (b, a)
+                if key not in pairs:
+                    distance = bin(hashes[a] ^ hashes[b]).count("1")
+                    if distance <= max_distance:
+                        pairs[key] = distance
+    return pairs
+
+
+def clusters(pairs):
+    """Connected groups of near-duplicate paths (union-find over the pairs)."""
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in pairs:
+        parent[find(a)] = find(b)
+    groups = defaultdict(list)
+    for x in list(parent):
+        groups[find(x)].append(x)
+    return sorted((sorted(g) for g in groups.values()), key=lambda g: (-len(g), g[0]))
+
+
+# ═══════════════════════════════════════════════════════════════
+# REFERENCES
+# ═══════════════════════════════════════════════════════════════
+
+def url_for(path):
+    return "/products/" + path.relative_to(PRODUCTS_DIR).as_posix()
+
+
+def frontend_references():
+    """Every "/products/..." path mentioned in the frontend sources."""
+    refs = set()
+    if SRC_DIR.is_dir():
+        for path in SRC_DIR.rglob("*"):
+            if path.suffix in (".js", ".jsx", ".ts", ".tsx", ".json") and path.is_file():
+                refs.update(re.findall(r'/products/[^"\'`\s)]+', path.read_text(encoding="utf-8", errors="ignore")))
+    return refs
+
+
+def count_map_references(value, counts):
+    if isinstance(value, dict):
+        for v in value.values():
+            count_map_references(v, counts)
+    elif isinstance(value, list):
+        for v in value:
+            count_map_references(v, counts)
+    elif isinstance(value, str) and value.startswith("/products/"):
+        counts[value] += 1
+
+
+def rewrite_map(value, mapping, key=None):
+    """Copy of an image-map value with every duplicate URL replaced by its canonical one."""
+    if isinstance(value, dict):
+        return {k: rewrite_map(v, mapping, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [rewrite_map(v, mapping) for v in value]
+    if isinstance(value, str):
+        if key == "srcset":
+            return ", ".join(
+                " ".join([mapping.get(url, url), *rest])
+                for url, *rest in (candidate.split(" ") for candidate in value.split(", "))
+            )
+        return mapping.get(value, value)
+    return value
+
+
+# ═══════════════════════════════════════════════════════════════
+# MAIN
+# ═══════════════════════════════════════════════════════════════
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Deduplicate the product image library")
+    parser.add_argument("--dir", type=Path, default=PRODUCTS_DIR, help="Image library (default: public/products)")
+    parser.add_argument("--max-distance", type=int, default=MAX_DISTANCE,
+                        help=f"dHash bits for a near-duplicate (default: {MAX_DISTANCE})")
+    parser.add_argument("--dry-run", action="store_true", help="Report only, change nothing")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    global PRODUCTS_DIR
+    args = parse_args(argv)
+    PRODUCTS_DIR = args.dir.resolve()
+    image_map_file = PRODUCTS_DIR / "image-map.json"
+
+    print("🧹 SUNTREX Product Image Dedupe")
+    print("=" * 60)
+
+    files = sorted(p for p in PRODUCTS_DIR.rglob("*") if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS)
+    total_bytes = sum(p.stat().st_size for p in files)
+    print(f"📂 {len(files)} images ({total_bytes / 1e6:.1f} MB) in {PRODUCTS_DIR}")
+
+    image_map = {}
+    if image_map_file.exists():
+        with open(image_map_file, encoding="utf-8") as f:
+            image_map = json.load(f)
+    map_refs = defaultdict(int)
+    count_map_references(image_map, map_refs)
+    frontend_refs = frontend_references()
+
+    # Exact duplicates
+    by_sha = defaultdict(list)
+    for path in files:
+        by_sha[sha256_file(path)].append(path)
+    groups = [paths for paths in by_sha.values() if len(paths) > 1]
+
+    def rank(path):
+        url = url_for(path)
+        return (url not in frontend_refs, -map_refs[url], len(url), url)
+
+    mapping = {}   # duplicate URL → canonical URL
+    removed = []
+    for paths in groups:
+        canonical, *copies = sorted(paths, key=rank)
+        for path in copies:
+            mapping[url_for(path)] = url_for(canonical)
+            if url_for(path) not in frontend_refs:
+                removed.append(path)
+    saved = sum(p.stat().st_size for p in removed)
+    print(f"🟰 {len(groups)} groups of identical files — {len(removed)} copies to remove ({saved / 1e6:.1f} MB)")
+
+    # Near duplicates (report only)
+    pairs = {}
+    if HAS_PIL:
+        removed_set = set(removed)
+        hashes = {}
+        for path in files:
+            if path.suffix.lower() in RASTER_EXTENSIONS and path not in removed_set and not LADDER_RE.search(path.name):
+                try:
+                    hashes[path] = dhash(path)
+                except Exception as e:
+                    print(f"  ⚠️  {url_for(path)}: {e}")
+        pairs = near_duplicate_pairs(hashes, args.max_distance)
+        print(f"🔍 {len(pairs)} near-duplicate pairs in {len(clusters(pairs))} groups "
+              f"(≤ {args.max_distance}/64 bits apart)")
+
+    report_path = PRODUCTS_DIR / "DUPLICATE-IMAGES.md"
+    if args.dry_run:
+        for dup, canonical in sorted(mapping.items()):
+            print(f"  {dup} → {canonical}")
+        print("\n  (dry run — nothing changed)")
+        return 0
+
+    if mapping and image_map:
+        new_map = rewrite_map(image_map, mapping)
+        write_atomic(image_map_file, json.dumps(new_map, ensure_ascii=False, indent=2))
+    for path in removed:
+        path.unlink()
+
+    lines = [
+        "# Images en double\n\n",
+        f"{len(removed)} copies identiques supprimées ({saved / 1e6:.1f} MB), "
+        "image-map.json pointe vers la copie canonique.\n\n",
+        "## Quasi-doublons à vérifier\n\n",
+        f"Empreinte perceptuelle (dHash) à {args.max_distance} bits ou moins sur 64.\n\n",
+    ]
+    for group in clusters(pairs):
+        worst = max(d for (a, b), d in pairs.items() if a in group)
+        lines.append(f"### {len(group)} images (jusqu'à {worst} bits d'écart)\n")
+        for path in group:
+            lines.append(f"- `{url_for(path)}`\n")
+        lines.append("\n")
+    kept = [url_for(p) for paths in groups for p in paths if url_for(p) in mapping and p not in removed]
+    if kept:
+        lines.append("\n## Doublons conservés (référencés dans src/)\n\n")
+        for url in sorted(kept):
+            lines.append(f"- `{url}` = `{mapping[url]}`\n")
+    write_atomic(report_path, "".join(lines))
+
+    print(f"\n{'=' * 60}")
+    print("🎉 DONE!")
+    print(f"  🗑️  Removed: {len(removed)} files ({saved / 1e6:.1f} MB)")
+    print(f"  🔁 image-map.json: {len(mapping)} paths rewritten")
+    print(f"  📋 Report: {report_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
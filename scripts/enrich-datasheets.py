@@ -3,12 +3,27 @@
 enrich-datasheets.py — Populate datasheet URLs in zoho-products.json
 based on brand-specific product page patterns.
 
-Usage: python3 scripts/enrich-datasheets.py
+SKUs with a PDF under public/datasheets/ (matched by datasheet_resolver,
+including range and series datasheets) get that local path instead of a
+remote guess.
+
+The file is streamed (one product in memory at a time) and rewritten via a
+temp file + atomic rename, only when at least one product changed.
+With --store, the SQLite catalog store (catalog_store.py) is updated
+instead (changed rows only, one transaction) and exported to the file;
+the store re-imports the file first if it was changed outside the store.
+
+Usage: python3 scripts/enrich-datasheets.py [--store [.cache/catalog.sqlite]]
 """
 
-import json
+import argparse
 import re
 import os
+from pathlib import Path
+
+from catalog_store import STORE_FILE, CatalogStore, SourceChanged
+from datasheet_resolver import DatasheetResolver
+from json_stream import JsonArrayWriter, iter_json_array
 
 ZOHO_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "data", "zoho-products.json")
 
@@ -83,29 +98,82 @@ def build_datasheet_url(product):
     return base
 
 
-def main():
-    with open(ZOHO_PATH, "r", encoding="utf-8") as f:
-        products = json.load(f)
-
-    enriched = 0
-    skipped = 0
-
-    for p in products:
-        if p.get("datasheet"):
-            skipped += 1
-            continue
-
-        url = build_datasheet_url(p)
-        if url:
-            p["datasheet"] = url
-            enriched += 1
-
-    with open(ZOHO_PATH, "w", encoding="utf-8") as f:
-        json.dump(products, f, ensure_ascii=False, indent=2)
-
-    print(f"Enriched {enriched} products with datasheet URLs")
-    print(f"Skipped {skipped} products (already had datasheets)")
-    print(f"Remaining without datasheet: {len([p for p in products if not p.get('datasheet')])}")
+def enrich_product(p, resolver):
+    """Set p["datasheet"] if it should change; returns "local", "enriched", "skipped" or "remaining".
+
+    A PDF we host (public/datasheets/) replaces a remote guess: served from
+    our CDN instead of a redirect to the manufacturer's site.
+    """
+    current = p.get("datasheet")
+    guess = build_datasheet_url(p)
+    local_url = resolver.resolve(p.get("sku") or "", p.get("brand"))
+    if local_url and current != local_url and (not current or current == guess):
+        p["datasheet"] = local_url
+        return "local"
+    if current:
+        return "skipped"
+    if guess:
+        p["datasheet"] = guess
+        return "enriched"
+    return "remaining"
+
+
+def enrich_store(store_file, resolver, counts):
+    """Same enrichment through the SQLite catalog store: only changed rows are written."""
+    with CatalogStore(store_file) as store:
+        store.refresh("zoho", ZOHO_PATH)
+        changes = {}
+        for p in store.products("zoho"):
+            outcome = enrich_product(p, resolver)
+            counts[outcome] += 1
+            # Rows are addressed by SKU: products without one are left to the JSON run
+            if outcome in ("local", "enriched") and p.get("sku"):
+                changes[p["sku"]] = {"datasheet": p["datasheet"]}
+        changed = store.update("zoho", changes, step="enrich")
+        try:
+            exported = store.export("zoho")
+        except SourceChanged as e:
+            # Changed on disk during the run: keep the rows pending, don't overwrite
+            print(f"⚠️  {e}")
+            exported = False
+    print(f"Store: {changed} rows updated in {store_file}"
+          + (", zoho-products.json exported" if exported else ""))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Populate datasheet URLs in zoho-products.json")
+    parser.add_argument("--store", type=Path, nargs="?", const=STORE_FILE, default=None,
+                        help=f"Update the SQLite catalog store instead, then export (default store: {STORE_FILE})")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    resolver = DatasheetResolver()
+    counts = {"local": 0, "enriched": 0, "skipped": 0, "remaining": 0}
+
+    if args.store:
+        enrich_store(args.store, resolver, counts)
+    else:
+        # Streamed: one product in memory at a time. A read-only pass counts
+        # the changes; only then is the file rewritten (temp file + atomic
+        # rename), so a run that changes nothing does no write I/O at all.
+        with open(ZOHO_PATH, "r", encoding="utf-8") as src:
+            for p in iter_json_array(src):
+                counts[enrich_product(p, resolver)] += 1
+        if counts["enriched"] or counts["local"]:
+            with open(ZOHO_PATH, "r", encoding="utf-8") as src, JsonArrayWriter(ZOHO_PATH) as out:
+                for p in iter_json_array(src):
+                    enrich_product(p, resolver)
+                    out.write(p)
+                out.commit()
+
+    print(f"Linked {counts['local']} products to local datasheets ({resolver.files} PDFs indexed)")
+    print(f"Enriched {counts['enriched']} products with datasheet URLs")
+    print(f"Skipped {counts['skipped']} products (already had datasheets)")
+    print(f"Remaining without datasheet: {counts['remaining']}")
+    if not (counts["enriched"] or counts["local"]):
+        print("Nothing changed — zoho-products.json left untouched")
 
 
 if __name__ == "__main__":
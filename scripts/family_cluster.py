@@ -0,0 +1,226 @@
+"""
+Automatic model-family proposals for the SKUs no MODEL_FAMILIES rule covers.
+
+Every unmatched SKU would otherwise get its own placeholder (or its own
+image search). Variants of one product usually differ only by a rating or
+a size, in the SKU and in the name alike:
+
+  HM/HYS-3.0LV-EUG1   Onduleur hybride monophasé Hoymiles - HYS-3.0LV-EUG1 (4,5 KW ...
+  HM/HYS-4.6LV-EUG1   Onduleur hybride monophasé Hoymiles - HYS-4.6LV-EUG1 (7.5 KW ...
+
+so SKUs are tokenised and reduced to two shapes, within one brand and
+category:
+
+- SKU shape: the brand prefix segment (``HM/``) is dropped and rating
+  tokens (``3.0LV``, ``2000``, ``75M``) become ``#``; series and suffix
+  tokens (``HYS``, ``EUG1``, ``SG04LP3``, ``KTL``...) are kept. Shapes made
+  only of ratings (``1008020``) say nothing and are ignored.
+- Name shape: the words of the product name without any token containing a
+  digit (ratings, dimensions, references).
+
+SKUs sharing either shape end up in the same proposed family (union-find),
+and only groups of at least ``min_size`` SKUs are proposed. Hand-written
+rules always take precedence: only SKUs left unmatched by FamilyMatcher are
+clustered. Each proposal has a MODEL_FAMILIES-style regex and search query,
+so it can be reviewed and pasted in as a hand rule (see report()).
+"""
+
+import json
+import re
+from collections import defaultdict
+
+BRAND_PREFIX_RE = re.compile(r'^[A-Za-z]{1,4}/')
+TOKEN_SPLIT_RE = re.compile(r'[-_/\s()]+')
+RATING_RE = re.compile(r'^\d+(?:[.,]\d+)?[A-Za-z]{0,3}$')
+RATING_PATTERN = r'\d+(?:[.,]\d+)?[A-Z]{0,3}'
+NAME_WORD_RE = re.compile(r"\S*\d\S*|[^\W\d_]+(?:['’][^\W\d_]+)?")
+STOP_WORDS = {
+    "de", "du", "des", "la", "le", "les", "et", "pour", "avec", "à", "a", "en", "sur",
+    "ref", "model", "modèle",
+}
+MIN_NAME_WORDS = 3
+
+
+def split_prefix(sku):
+    """("HM/", "HYS-3.0LV-EUG1") for a brand-prefixed SKU, ("", sku) otherwise."""
+    m = BRAND_PREFIX_RE.match(sku)
+    return (m.group(0), sku[m.end():]) if m else ("", sku)
+
+
+def sku_shape(sku):
+    """Series/suffix tokens of the SKU with ratings as "#", or None if only ratings."""
+    tokens = [t for t in TOKEN_SPLIT_RE.split(split_prefix(sku)[1]) if t]
+    shape = ['#' if RATING_RE.match(t) else t.upper() for t in tokens]
+    if not any(len(re.sub(r'[^A-Z]', '', t)) >= 2 for t in shape):
+        return None
+    return "-".join(shape)
+
+
+def name_words(name):
+    return [
+        w for w in NAME_WORD_RE.findall((name or "").lower())
+        if not re.search(r'\d', w) and w not in STOP_WORDS
+    ]
+
+
+def name_shape(name):
+    words = name_words(name)
+    return " ".join(words) if len(words) >= MIN_NAME_WORDS else None
+
+
+def match_key(sku):
+    """Bucket of SKUs a proposed pattern can match: a generalised pattern only
+    matches SKUs of its members' shape, a listed one only their own models."""
+    return sku_shape(sku) or split_prefix(sku)[1].upper()
+
+
+def sku_pattern(skus):
+    """MODEL_FAMILIES regex matching every SKU of a proposed family.
+
+    SKUs of one shape give a generalised pattern (ratings as a digit class),
+    so future variants of the series match too; otherwise the SKUs are listed.
+    A shared brand prefix is kept in front so FamilyMatcher can dispatch on it.
+    """
+    prefixes = {split_prefix(sku)[0] for sku in skus}
+    prefix = prefixes.pop() if len(prefixes) == 1 else ""
+    models = [sku[len(prefix):] for sku in skus]
+    if len({sku_shape(sku) for sku in skus}) == 1 and sku_shape(skus[0]):
+        parts = []
+        for piece in re.split(r'([-_/\s()]+)', models[0]):
+            if not piece:
+                continue
+            parts.append(RATING_PATTERN if RATING_RE.match(piece) else re.escape(piece))
+        body = "".join(parts)
+    else:
+        body = "(?:" + "|".join(re.escape(m) for m in sorted(models)) + ")"
+    return f"{re.escape(prefix)}{body}$" if prefix else f"^{body}$"
+
+
+class ProposedFamily:
+    def __init__(self, family_id, brand, category, products):
+        self.family_id = family_id
+        self.extends = None  # hand-written family whose SKUs the pattern also matches
+        self.brand = brand
+        self.category = category
+        self.skus = [p['sku'] for p in products]
+        self.name = products[0].get('name') or self.skus[0]
+        self.pattern = sku_pattern(self.skus)
+        words = [w for w in re.sub(r'[(\[][^)\]]*[)\]]?', ' ', self.name).split() if w not in "-–:="]
+        self.search = " ".join(words[:8])
+        if brand and brand.lower() not in self.search.lower():
+            self.search = f"{brand} {self.search}"
+
+    def rule(self):
+        """MODEL_FAMILIES entry (with "auto" set, so it can be told apart)."""
+        return {"pattern": self.pattern, "search": self.search, "auto": True}
+
+
+def _label(products):
+    """Short id part: the SKU tokens all members share, else the name words."""
+    shapes = [sku_shape(p['sku']) or "" for p in products]
+    common = set(shapes[0].split("-"))
+    for shape in shapes[1:]:
+        common &= set(shape.split("-"))
+    tokens = [t for t in shapes[0].split("-") if t in common and t not in ("", "#")]
+    if tokens:
+        return "-".join(tokens)
+    brand_words = set((products[0].get('brand') or "").lower().split())
+    return "-".join(w for w in name_words(products[0].get('name'))[:6] if w not in brand_words)
+
+
+def propose_families(products, slugify, min_size=2, claimed=None, taken=()):
+    """Cluster products (catalog dicts no hand rule matched) into ProposedFamily objects.
+
+    ``slugify`` builds the family ids (the scraper's, so ids look like the
+    hand-written ones); ids in ``taken`` are never reused. ``claimed`` is
+    the SKU → family_id map of the hand rules: a proposal whose pattern also
+    matches SKUs of exactly one hand family is a missing variant of it
+    (e.g. ``SUN2000-3,6KTL-L1`` next to a rule written for ``3.6KTL``) and
+    gets ``extends`` set.
+    """
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    by_sku = {}
+    keys = defaultdict(list)
+    for product in products:
+        sku = product['sku']
+        if sku in by_sku:
+            continue
+        by_sku[sku] = product
+        find(sku)
+        brand, category = product.get('brand'), product.get('category')
+        shape = sku_shape(sku)
+        if shape:
+            keys[('sku', brand, category, shape)].append(sku)
+        shape = name_shape(product.get('name'))
+        if shape:
+            keys[('name', brand, category, shape)].append(sku)
+    for skus in keys.values():
+        for sku in skus[1:]:
+            parent[find(sku)] = find(skus[0])
+
+    clusters = defaultdict(list)
+    for sku, product in by_sku.items():
+        clusters[find(sku)].append(product)
+
+    # Claimed SKUs by match_key(): each proposal is only tested against the
+    # buckets of its members instead of every claimed SKU
+    claimed_by_key = defaultdict(list)
+    for sku, fid in (claimed or {}).items():
+        claimed_by_key[match_key(sku)].append((sku, fid))
+
+    used = set(taken)
+    families = []
+    for members in clusters.values():
+        if len(members) < min_size:
+            continue
+        brand, category = members[0].get('brand'), members[0].get('category')
+        base = slugify(f"{brand or 'unknown'} {_label(members)}").strip("-")
+        family_id, n = base, 2
+        while family_id in used:
+            family_id, n = f"{base}-{n}", n + 1
+        used.add(family_id)
+        family = ProposedFamily(family_id, brand, category, members)
+        pattern = re.compile(family.pattern, re.IGNORECASE)
+        candidates = {item for key in {match_key(sku) for sku in family.skus} for item in claimed_by_key[key]}
+        overlapping = {fid for sku, fid in candidates if pattern.search(sku)}
+        if len(overlapping) == 1:
+            family.extends = overlapping.pop()
+        families.append(family)
+    families.sort(key=lambda f: (-len(f.skus), f.family_id))
+    return families
+
+
+def report(families, fetched=True):
+    """Markdown list of the proposed families, as MODEL_FAMILIES entries to review."""
+    covered = sum(len(f.skus) for f in families)
+    lines = [
+        "# Familles de modèles proposées\n\n",
+        f"{len(families)} familles regroupent {covered} SKUs qu'aucune règle de MODEL_FAMILIES ne couvre.\n",
+        ("Elles ont été utilisées pour ce scraping (une image par famille). " if fetched else
+         "Elles n'ont pas été utilisées : à relire avant usage (ou relancez avec --auto-families). "),
+        "Après vérification, copiez les entrées dans MODEL_FAMILIES "
+        "(scripts/scrape-product-images.py) ; les règles écrites à la main sont prioritaires.\n\n",
+    ]
+    for family in families:
+        lines.append(f"## {family.brand} — {family.family_id} ({len(family.skus)} SKUs, {family.category})\n\n")
+        lines.append(f"- {', '.join(family.skus[:8])}{' …' if len(family.skus) > 8 else ''}\n")
+        lines.append(f"- Exemple: {family.name}\n")
+        if family.extends:
+            lines.append(f"- ⚠️  Le motif couvre aussi des SKUs de `{family.extends}` : "
+                         f"ce sont des variantes manquantes, élargissez plutôt son motif.\n")
+        lines.append("\n")
+        lines.append("```python\n")
+        lines.append(f'    "{family.family_id}": {{\n')
+        lines.append(f'        "pattern": r"{family.pattern}",\n')
+        lines.append(f'        "search": {json.dumps(family.search, ensure_ascii=False)},\n')
+        lines.append("    },\n")
+        lines.append("```\n\n")
+    return "".join(lines)
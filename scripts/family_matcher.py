@@ -0,0 +1,175 @@
+"""
+SKU → model family matching for scrape-product-images.py.
+
+MODEL_FAMILIES patterns are searched case-insensitively anywhere in the SKU,
+and when several families match, the last one in MODEL_FAMILIES order wins.
+FamilyMatcher keeps exactly those semantics but avoids testing every pattern
+against every SKU:
+
+- Patterns starting with a plain brand prefix (``HUA/``, ``DEY/``,
+  ``HM[YS]/``...) are bucketed by that prefix. A SKU is only tested against
+  the buckets whose prefix matches one of its ``/``-separated segments, and
+  the segment → buckets dispatch is cached, so it is computed once per
+  distinct prefix rather than once per SKU.
+- Other patterns (``ENP.*IQ8``, ``(ESD/)?10081...``, top-level ``a|b``) form
+  a "floating" bucket tested against every SKU.
+- Each bucket has one compiled alternation of its patterns: a single regex
+  call rejects SKUs matching none of them, and the individual patterns are
+  only run on a hit (so overlaps can be reported).
+
+group() does one pass over the catalog and returns the family → SKUs groups,
+the brand/category of each SKU and every SKU claimed by several families.
+Cost is linear in the number of SKUs.
+"""
+
+import re
+
+# Leading "<prefix>/" made of word characters and simple classes, e.g. HUA/ or HM[YS]/
+PREFIX_RE = re.compile(r'^((?:\w|\[[^\]/\\]*\])+)/')
+
+
+def _has_top_level_alternation(pattern):
+    depth = 0
+    escaped = in_class = False
+    for ch in pattern:
+        if escaped:
+            escaped = False
+        elif ch == '\\':
+            escaped = True
+        elif in_class:
+            in_class = ch != ']'
+        elif ch == '[':
+            in_class = True
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == '|' and depth == 0:
+            return True
+    return False
+
+
+def dispatch_prefix(pattern):
+    """The SKU prefix a pattern requires (regex source), or None if floating."""
+    if _has_top_level_alternation(pattern):
+        return None
+    m = PREFIX_RE.match(pattern)
+    return m.group(1) if m else None
+
+
+class Bucket:
+    """Families sharing a dispatch prefix, in MODEL_FAMILIES order."""
+
+    def __init__(self, prefix):
+        self.prefix = re.compile(f'(?:{prefix})$', re.IGNORECASE) if prefix else None
+        self.families = []  # (order, family_id, compiled pattern)
+        self.any = None
+
+    def add(self, order, family_id, pattern):
+        self.families.append((order, family_id, re.compile(pattern, re.IGNORECASE)))
+
+    def freeze(self):
+        self.any = re.compile("|".join(f"(?:{p.pattern})" for _, _, p in self.families), re.IGNORECASE)
+
+    def matches(self, sku):
+        if not self.any.search(sku):
+            return []
+        return [(order, fid) for order, fid, pattern in self.families if pattern.search(sku)]
+
+
+class CatalogGroups:
+    """Result of FamilyMatcher.group()."""
+
+    def __init__(self):
+        self.sku_to_family = {}   # SKU → winning family_id
+        self.family_skus = {}     # family_id → [SKU, ...]
+        self.brand = {}           # SKU → brand (first catalog entry)
+        self.category = {}        # SKU → category (first catalog entry)
+        self.overlaps = {}        # SKU → [family_id, ...] when several rules match
+
+    def add_family(self, family_id, skus):
+        """Assign still unmatched SKUs to a family (a proposed one, or a hand family they extend)."""
+        for sku in skus:
+            if sku not in self.sku_to_family:
+                self.sku_to_family[sku] = family_id
+                self.family_skus.setdefault(family_id, []).append(sku)
+
+    def first_sku(self, family_id):
+        skus = self.family_skus.get(family_id)
+        return skus[0] if skus else None
+
+
+class FamilyMatcher:
+    def __init__(self, families):
+        self.buckets = {}
+        self.floating = Bucket(None)
+        for order, (family_id, family) in enumerate(families.items()):
+            prefix = dispatch_prefix(family['pattern'])
+            if prefix is None:
+                bucket = self.floating
+            else:
+                bucket = self.buckets.setdefault(prefix.upper(), Bucket(prefix))
+            bucket.add(order, family_id, family['pattern'])
+        for bucket in self.all_buckets():
+            bucket.freeze()
+        self._dispatch = {}  # SKU segment (upper-cased) → [Bucket, ...]
+
+    def all_buckets(self):
+        buckets = list(self.buckets.values())
+        if self.floating.families:
+            buckets.append(self.floating)
+        return buckets
+
+    def _buckets_for_segment(self, segment):
+        key = segment.upper()
+        if key not in self._dispatch:
+            self._dispatch[key] = [b for b in self.buckets.values() if b.prefix.search(segment)]
+        return self._dispatch[key]
+
+    def candidates(self, sku):
+        """Buckets that can possibly match sku."""
+        seen = []
+        for segment in sku.split('/')[:-1]:
+            for bucket in self._buckets_for_segment(segment):
+                if bucket not in seen:
+                    seen.append(bucket)
+        if self.floating.families:
+            seen.append(self.floating)
+        return seen
+
+    def matches(self, sku):
+        """Every (order, family_id) whose pattern matches sku, in family order."""
+        hits = []
+        for bucket in self.candidates(sku):
+            hits.extend(bucket.matches(sku))
+        return sorted(hits)
+
+    def match(self, sku):
+        """Winning family_id for sku (last matching rule), or None."""
+        hits = self.matches(sku)
+        return hits[-1][1] if hits else None
+
+    def group(self, catalog):
+        """One pass over catalog products (dicts with sku/brand/category)."""
+        groups = CatalogGroups()
+        ranked = []  # (first matching family order, catalog position, sku, winner)
+        for position, product in enumerate(catalog):
+            sku = product['sku']
+            if sku in groups.brand:
+                continue
+            groups.brand[sku] = product.get('brand')
+            groups.category[sku] = product.get('category')
+            hits = self.matches(sku)
+            if not hits:
+                continue
+            winner = hits[-1][1]
+            if len(hits) > 1:
+                groups.overlaps[sku] = [fid for _, fid in hits]
+            ranked.append((hits[0][0], position, sku, winner))
+
+        # Same ordering as the former families × catalog loop: a SKU is
+        # listed where its first matching family first claimed it.
+        for _, _, sku, winner in sorted(ranked):
+            groups.sku_to_family[sku] = winner
+            groups.family_skus.setdefault(winner, []).append(sku)
+        return groups
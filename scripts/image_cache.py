@@ -0,0 +1,207 @@
+"""
+Content-addressed cache of original downloaded images for
+scrape-product-images.py.
+
+Layout under the cache root:
+  blobs/<sha256[:2]>/<sha256>   original bytes, stored once per content
+  index.json                    {"urls": {url: meta}, "outputs": {path: meta}}
+
+``urls`` keeps the sha256, ETag and Last-Modified of every fetched URL so a
+re-fetch can be a conditional request (304 → reuse the blob). ``outputs``
+records which blob and which render settings produced each WebP, so a
+deleted WebP or a MAX_SIZE/QUALITY change is rebuilt from the blob with no
+network traffic. Blobs are touched on use and evicted least recently used
+first once the cache grows past ``max_bytes``.
+
+NegativeCache (failures.json) remembers searches that found nothing and
+candidate URLs that are dead, with the reason and an expiry, so later runs
+do not repeat them until the TTL runs out.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from atomic_file import AtomicFile, write_atomic
+
+
+class ImageCache:
+    def __init__(self, root, max_bytes=512 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.urls = {}
+        self.outputs = {}
+        index = self.root / "index.json"
+        if index.exists():
+            try:
+                with open(index, encoding="utf-8") as f:
+                    data = json.load(f)
+                self.urls = data.get("urls", {})
+                self.outputs = data.get("outputs", {})
+            except (OSError, ValueError):
+                pass
+
+    # ── Blobs ────────────────────────────────────────────────────────
+    def blob_path(self, sha):
+        return self.root / "blobs" / sha[:2] / sha
+
+    def has_blob(self, sha):
+        return bool(sha) and self.blob_path(sha).exists()
+
+    def touch(self, sha):
+        """Mark a blob as recently used; False if it is gone."""
+        try:
+            os.utime(self.blob_path(sha))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def put_stream(self, chunks):
+        """Store a body given as byte chunks without holding it in memory.
+
+        The chunks are hashed while being written to a temp file, which is
+        then renamed to its content address. If the iterator raises (size
+        cap, connection reset), the temp file is removed and the error
+        propagates. Returns (sha256, size).
+        """
+        digest = hashlib.sha256()
+        size = 0
+        with AtomicFile(self.root / "blobs" / "incoming", "wb") as f:
+            for chunk in chunks:
+                digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+            sha = digest.hexdigest()
+            path = self.blob_path(sha)
+            if path.exists():
+                os.utime(path)
+            else:
+                f.commit(path)
+        return sha, size
+
+    # ── URLs (conditional requests) ──────────────────────────────────
+    def lookup(self, url):
+        """Cached meta for url, only if its blob is still present."""
+        with self.lock:
+            meta = self.urls.get(url)
+        return meta if meta and self.has_blob(meta["sha256"]) else None
+
+    def conditional_headers(self, url):
+        meta = self.lookup(url)
+        headers = {}
+        if meta and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def store(self, url, chunks, headers):
+        """Keep the original body of a 200 answer (byte chunks); returns its sha256."""
+        sha, size = self.put_stream(chunks)
+        with self.lock:
+            self.urls[url] = {
+                "sha256": sha,
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+                "content_type": headers.get("Content-Type"),
+                "size": size,
+                "fetched_at": time.time(),
+            }
+        return sha
+
+    # ── Rendered outputs ─────────────────────────────────────────────
+    def record_output(self, path, sha, render, manifest=None):
+        """Remember which original and settings produced path (and its variants)."""
+        with self.lock:
+            self.outputs[str(path)] = {"sha256": sha, "render": render, "manifest": manifest or {}}
+
+    def output(self, path):
+        with self.lock:
+            return self.outputs.get(str(path))
+
+    # ── Persistence / eviction ───────────────────────────────────────
+    def save(self):
+        with self.lock:
+            data = json.dumps({"urls": self.urls, "outputs": self.outputs}, indent=1, ensure_ascii=False)
+        write_atomic(self.root / "index.json", data)
+
+    def evict(self):
+        """Drop least recently used blobs until the cache fits in max_bytes."""
+        blobs = []
+        blob_dir = self.root / "blobs"
+        if blob_dir.is_dir():
+            for path in blob_dir.glob("*/*"):
+                if not path.name.startswith("."):
+                    st = path.stat()
+                    blobs.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in blobs)
+        removed = set()
+        for _, size, path in sorted(blobs):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            try:
+                path.parent.rmdir()
+            except OSError:
+                pass  # other blobs share the prefix directory
+            removed.add(path.name)
+            total -= size
+        if removed:
+            with self.lock:
+                self.urls = {u: m for u, m in self.urls.items() if m["sha256"] not in removed}
+        return len(removed)
+
+
+class NegativeCache:
+    """Failed image searches and dead candidate URLs, each with a TTL.
+
+    Entries look like {"reason": ..., "failed_at": ...}; they expire
+    ``ttl_seconds`` after failed_at, so a shorter TTL applies retroactively.
+    With ``ignore=True`` (--retry-failed) nothing is skipped, but failures
+    are still recorded and successes still clear their entries.
+    """
+
+    def __init__(self, path, ttl_seconds, ignore=False):
+        self.path = Path(path)
+        self.ttl = ttl_seconds
+        self.ignore = ignore
+        self.lock = threading.Lock()
+        self.entries = {"searches": {}, "urls": {}}
+        if self.path.exists():
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                for kind in self.entries:
+                    self.entries[kind] = {
+                        key: e for key, e in data.get(kind, {}).items() if self._live(e)
+                    }
+            except (OSError, ValueError, KeyError):
+                pass
+
+    def _live(self, entry):
+        return entry["failed_at"] + self.ttl > time.time()
+
+    def failed(self, kind, key):
+        """The live failure entry for key, or None (always None when ignoring)."""
+        if self.ignore:
+            return None
+        with self.lock:
+            entry = self.entries[kind].get(key)
+        return entry if entry and self._live(entry) else None
+
+    def record(self, kind, key, reason):
+        with self.lock:
+            self.entries[kind][key] = {"reason": reason, "failed_at": time.time()}
+
+    def clear(self, kind, key):
+        with self.lock:
+            self.entries[kind].pop(key, None)
+
+    def save(self):
+        with self.lock:
+            data = json.dumps(self.entries, indent=1, ensure_ascii=False)
+        write_atomic(self.path, data)
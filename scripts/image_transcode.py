@@ -0,0 +1,239 @@
+"""
+Transcoding stage of scrape-product-images.py.
+
+Decoding, RGBA flattening, LANCZOS thumbnailing and WebP encoding are CPU
+bound, so they run in a process pool instead of the fetch threads. Fetchers
+hand work over through a bounded queue (TranscodeStage.submit() blocks when
+it is full), which keeps the originals held in memory bounded and lets
+network and CPU work overlap.
+
+Besides the main <family>.webp, each original can be rendered as a
+responsive ladder (e.g. 160/320/600 px in AVIF and WebP) with content-hashed
+file names and a tiny inline blur placeholder; see transcode_file().
+
+Tasks reference the original by its path in the image cache, so only short
+strings are pickled to the workers.
+"""
+
+import base64
+import hashlib
+import multiprocessing
+import os
+import queue
+import re
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from atomic_file import write_atomic
+
+try:
+    from PIL import Image, features
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+PLACEHOLDER_SIZE = 16  # px, longest side of the inline blur placeholder
+
+
+def sniff_image_type(head):
+    """Image format from the first bytes of a file, or None if it is not one we decode."""
+    if head.startswith(b'\xff\xd8\xff'):
+        return "jpeg"
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return "png"
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return "gif"
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return "webp"
+    if head[4:8] == b'ftyp' and head[8:12] in (b'avif', b'avis'):
+        return "avif"
+    if head[:4] in (b'II*\x00', b'MM\x00*'):
+        return "tiff"
+    if head[:2] == b'BM':
+        return "bmp"
+    return None
+
+
+def available_formats(formats):
+    """The formats this Pillow build can encode (AVIF needs libavif)."""
+    if not HAS_PIL:
+        return []
+    return [fmt for fmt in formats if features.check(fmt)]
+
+
+def _flatten(img):
+    """RGB copy of img, transparency composited on white (for WebP/AVIF output)."""
+    if img.mode in ('RGBA', 'P'):
+        img = img.convert('RGBA')
+        bg = Image.new('RGBA', img.size, (255, 255, 255, 255))
+        bg.paste(img, mask=img.split()[3])
+        return bg.convert('RGB')
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
+
+
+def _encode(img, fmt, quality):
+    buf = BytesIO()
+    img.save(buf, fmt.upper(), quality=quality)
+    return buf.getvalue()
+
+
+def _variants(img, dest, sizes, formats, qualities):
+    """Write the size ladder next to dest as <stem>-<width>.<hash8>.<ext>.
+
+    Names change with the content, so the files can be served as immutable;
+    stale variants of the same stem are removed.
+    """
+    dest = Path(dest)
+    stale = re.compile(rf'^{re.escape(dest.stem)}-\d+\.[0-9a-f]{{8}}\.({"|".join(MIME_TYPES)})$')
+    keep = set()
+    sources = {fmt: [] for fmt in formats}
+    widths = set()
+    for size in sorted(sizes, reverse=True):
+        variant = img.copy()
+        variant.thumbnail((size, size), Image.LANCZOS)
+        if variant.width in widths:
+            continue  # source smaller than this rung: no upscaled duplicates
+        widths.add(variant.width)
+        for fmt in formats:
+            data = _encode(variant, fmt, qualities[fmt])
+            name = f"{dest.stem}-{variant.width}.{hashlib.sha256(data).hexdigest()[:8]}.{fmt}"
+            if not (dest.parent / name).exists():
+                write_atomic(dest.parent / name, data)
+            keep.add(name)
+            sources[fmt].append({
+                "file": name, "width": variant.width, "height": variant.height, "bytes": len(data),
+            })
+    for old in dest.parent.iterdir():
+        if stale.match(old.name) and old.name not in keep:
+            old.unlink(missing_ok=True)
+    return [
+        {"type": MIME_TYPES[fmt], "variants": sorted(sources[fmt], key=lambda v: v["width"])}
+        for fmt in formats
+    ]
+
+
+def _placeholder(img):
+    """Tiny WebP data URI, meant to be shown blurred while the image loads."""
+    thumb = img.copy()
+    thumb.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.LANCZOS)
+    return "data:image/webp;base64," + base64.b64encode(_encode(thumb, "webp", 30)).decode()
+
+
+def transcode_file(src, dest, max_size, quality, resize=True, sizes=(), formats=(), qualities=None):
+    """Render the original image at src into dest as a WebP (atomic write).
+
+    With ``sizes``/``formats`` (e.g. (160, 320, 600) and ("avif", "webp"))
+    the responsive ladder is written next to dest as well. Returns a manifest
+    {width, height, placeholder, sources: [{type, variants: [{file, width,
+    height, bytes}]}]}; without Pillow (or with resize=False) the original
+    bytes are copied and the manifest is empty.
+
+    Runs in a pool worker, so it only takes and returns plain values.
+    """
+    if not (HAS_PIL and resize):
+        write_atomic(dest, Path(src).read_bytes())
+        return {}
+
+    with Image.open(src) as original:
+        if original.format == "JPEG":
+            # Let libjpeg decode at 1/2, 1/4 or 1/8 scale, still at least as
+            # large as the biggest output: far less memory and CPU for huge photos.
+            box = max([*max_size, *sizes])
+            original.draft("RGB", (box, box))
+        img = _flatten(original)
+        img.load()
+
+    main = img.copy()
+    main.thumbnail(max_size, Image.LANCZOS)
+    write_atomic(dest, _encode(main, "webp", quality))
+    manifest = {"width": main.width, "height": main.height, "placeholder": _placeholder(img)}
+    if sizes and formats:
+        qualities = {fmt: quality for fmt in formats} | (qualities or {})
+        manifest["sources"] = _variants(img, dest, sizes, formats, qualities)
+    return manifest
+
+
+def _init_worker():
+    """Pool initializer: Ctrl-C is handled by the parent (TranscodeStage.cancel())."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class TranscodeStage:
+    """Bounded queue in front of a process pool running transcode_file().
+
+    submit() blocks while ``queue_size`` tasks are waiting; a feeder thread
+    moves tasks into the pool, at most two per worker in flight. close()
+    waits for everything and returns {key: (manifest, error message)}.
+
+    Workers are spawned rather than forked: the fetch threads are already
+    running (and holding locks) when the pool starts. They ignore SIGINT;
+    on Ctrl-C the parent calls cancel(), and tasks it cancels are dropped
+    without a result or an on_done call.
+    """
+
+    def __init__(self, workers=None, queue_size=16, on_done=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.slots = threading.Semaphore(self.workers * 2)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                        mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_init_worker)
+        self.lock = threading.Lock()
+        self.results = {}
+        self.on_done = on_done  # called as on_done(key, manifest, error) from a pool thread
+        self.cancelled = False
+        self.feeder = threading.Thread(target=self._feed, daemon=True)
+        self.feeder.start()
+
+    def submit(self, key, src, dest, max_size, quality, **options):
+        """Queue transcode_file(src, dest, max_size, quality, **options) under key."""
+        if self.cancelled:
+            return
+        self.queue.put((key, (str(src), str(dest), tuple(max_size), quality), options))
+
+    def _feed(self):
+        while True:
+            task = self.queue.get()
+            if task is None:
+                return
+            self.slots.acquire()
+            key, args, options = task
+            future = self.pool.submit(transcode_file, *args, **options)
+            future.add_done_callback(lambda f, key=key: self._done(key, f))
+
+    def _done(self, key, future):
+        if future.cancelled():
+            self.slots.release()
+            return
+        error = future.exception()
+        with self.lock:
+            if error:
+                self.results[key] = (None, f"{type(error).__name__}: {error}")
+            else:
+                self.results[key] = (future.result(), None)
+        self.slots.release()
+        if self.on_done:
+            self.on_done(key, *self.results[key])
+
+    def cancel(self):
+        """Drop queued tasks and stop the pool without waiting (Ctrl-C)."""
+        self.cancelled = True
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        self.queue.put(None)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        self.queue.put(None)
+        self.feeder.join()
+        self.pool.shutdown(wait=True)
+        return self.results
@@ -0,0 +1,111 @@
+"""Streaming read / atomic rewrite of large JSON arrays (catalog exports).
+
+iter_json_array() yields the elements of a top-level JSON array one at a
+time, decoding from a small sliding buffer, so memory stays at about one
+record plus one read chunk whatever the file size.
+
+JsonArrayWriter writes elements to a temp file next to the target, in
+exactly the layout of json.dump(items, f, ensure_ascii=False, indent=2),
+and only replaces the target (atomic rename) on commit(). A run that
+changed nothing calls discard() instead and leaves the file untouched.
+
+    with open(path, encoding="utf-8") as src, JsonArrayWriter(path) as out:
+        for item in iter_json_array(src):
+            changed |= enrich(item)
+            out.write(item)
+        if changed:
+            out.commit()
+"""
+
+import json
+from pathlib import Path
+
+from atomic_file import AtomicFile
+
+CHUNK_SIZE = 64 * 1024
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",]"
+
+
+def iter_json_array(f, chunk_size=CHUNK_SIZE):
+    """Yield each element of the JSON array read from text file f."""
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def skip(chars):
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    skip(_WHITESPACE)
+    if buf[pos:pos + 1] != "[":
+        raise ValueError("expected a JSON array")
+    pos += 1
+    first = True
+    while True:
+        skip(_WHITESPACE)
+        if buf[pos:pos + 1] == "]":
+            return
+        if not first:
+            if buf[pos:pos + 1] != ",":
+                raise ValueError(f"expected ',' or ']' in JSON array, got {buf[pos:pos + 20]!r}")
+            pos += 1
+            skip(_WHITESPACE)
+        first = False
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            if not eof and (end == len(buf) or buf[end] not in _DELIMITERS):
+                fill()  # a number cut by the chunk boundary ("1" of "1.5"): read on
+                continue
+            break
+        pos = end
+        yield item
+
+
+class JsonArrayWriter:
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = None
+        self.count = 0
+
+    def __enter__(self):
+        self._file = AtomicFile(self.path)
+        self._file.write("[")
+        return self
+
+    def write(self, item):
+        text = json.dumps(item, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        self._file.write(("," if self.count else "") + "\n  " + text)
+        self.count += 1
+
+    def commit(self):
+        """Finish the array, fsync and atomically replace the target."""
+        self._file.write("\n]" if self.count else "]")
+        self._file.commit()
+
+    def discard(self):
+        self._file.discard()
+
+    def __exit__(self, exc_type, exc, tb):
+        # Nothing committed (no-op run or error): the target is left as it was
+        return self._file.__exit__(exc_type, exc, tb)
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+mirror-datasheets.py — Mirror the catalog's remote datasheet URLs under
+public/datasheets/ and point zoho-products.json at the local copies.
+
+- Every distinct remote URL is fetched once, concurrently (bounded worker
+  pool, per-host rate limit, retries: scraper_net.HttpClient). Redirects are
+  followed; a URL answering with an HTML page is followed through to the PDF
+  it links for each SKU (PDF link whose file name matches the SKU's model).
+- PDFs are stored as public/datasheets/<brand>/<sha256[:16]>.pdf, streamed
+  and size-capped. Identical content is stored once: a series datasheet
+  linked from ten SKUs, or a PDF already copied in by hand, is reused.
+  Hashes of the hosted PDFs are kept in .cache/datasheet-hashes.json by
+  size and mtime, so only new or changed files are re-hashed.
+- The catalog's datasheet fields are rewritten to /datasheets/... (streamed,
+  atomic; untouched if nothing was mirrored). Broken links keep their URL and
+  are listed in public/datasheets/BROKEN-DATASHEETS.md. With --store the
+  links are updated in the SQLite catalog store (catalog_store.py) instead,
+  then exported, so enrichment or the scraper running alongside keep their
+  changes.
+
+Only the URLs found in the catalog are requested, so it runs as is against a
+local HTTP stand-in (a catalog whose URLs point at ``python3 -m http.server``).
+
+Usage:
+  python3 scripts/mirror-datasheets.py [--workers 8] [--rate 1] [--catalog src/data/zoho-products.json]
+                                       [--store [.cache/catalog.sqlite]]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import itertools
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from urllib.parse import unquote, urljoin, urlsplit
+
+from atomic_file import AtomicFile, write_atomic
+from catalog_store import STORE_FILE, CatalogStore, SourceChanged
+from datasheet_resolver import tokens
+from json_stream import JsonArrayWriter, iter_json_array
+from scraper_net import HostRateLimiter, HttpClient, iter_capped, run_concurrently
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+CATALOG_FILE = PROJECT_DIR / "src" / "data" / "zoho-products.json"
+DATASHEETS_DIR = PROJECT_DIR / "public" / "datasheets"
+HASH_CACHE_FILE = PROJECT_DIR / ".cache" / "datasheet-hashes.json"  # relative path → size/mtime/sha256
+REPORT_NAME = "BROKEN-DATASHEETS.md"
+WORKERS = 8  # URLs fetched concurrently
+RATE = 1.0  # Max requests/s per host
+RETRIES = 3
+MAX_PDF_MB = 50
+MAX_PAGE_BYTES = 2 * 1024 * 1024  # HTML pages scanned for PDF links
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
+PDF_LINK_RE = re.compile(r'href\s*=\s*["\']([^"\'#]+?\.pdf(?:\?[^"\']*)?)["\']', re.IGNORECASE)
+
+
+def slugify(text):
+    text = text.lower().strip()
+    text = re.sub(r"[^a-z0-9]+", "-", text)
+    return text.strip("-")
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class NotAPdf(ValueError):
+    """The URL (or the page it leads to) yields no PDF."""
+
+
+def sku_tokens(sku):
+    return tokens(re.sub(r'^[A-Za-z]{1,4}/', "", sku))
+
+
+def pick_pdf(links, sku):
+    """Best PDF link of a page for sku: most shared model tokens (at least
+    two, one of them with a digit), or None."""
+    wanted = set(sku_tokens(sku))
+    best, best_score = None, 1
+    for link in links:
+        name = unquote(urlsplit(link).path.rsplit("/", 1)[-1])
+        shared = wanted & set(tokens(Path(name).stem))
+        if len(shared) > best_score and any(ch.isdigit() for t in shared for ch in t):
+            best, best_score = link, len(shared)
+    return best
+
+
+class Mirror:
+    """Fetches datasheets into the brand folders, one file per content hash."""
+
+    def __init__(self, http, root, max_bytes, hash_cache=None):
+        self.http = http
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hash_cache = Path(hash_cache) if hash_cache else None
+        self.lock = threading.Lock()
+        self.by_sha = {}     # sha256 → /datasheets/... (hand-copied files included)
+        self.by_pdf = {}     # PDF URL → /datasheets/... (several pages may link one PDF)
+        self.hashes = {}     # relative path → {size, mtime_ns, sha256}
+        self.downloaded = 0
+        self.reused = 0
+        self.hashed = 0      # files (re-)hashed at startup, not answered by the hash cache
+        known = {}
+        if self.hash_cache and self.hash_cache.exists():
+            try:
+                with open(self.hash_cache, encoding="utf-8") as f:
+                    known = json.load(f)
+            except (OSError, ValueError):
+                known = {}
+        if self.root.is_dir():
+            for path in sorted(self.root.rglob("*.pdf")):
+                self.by_sha.setdefault(self.file_hash(path, known), self.url_for(path))
+
+    def url_for(self, path):
+        return "/datasheets/" + Path(path).relative_to(self.root).as_posix()
+
+    def file_hash(self, path, known=None):
+        """sha256 of a hosted PDF, from the hash cache while its size/mtime match."""
+        rel = Path(path).relative_to(self.root).as_posix()
+        st = os.stat(path)
+        entry = (known or {}).get(rel)
+        if not (entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns):
+            entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha256_file(path)}
+            self.hashed += 1
+        self.hashes[rel] = entry
+        return entry["sha256"]
+
+    def save_hashes(self):
+        if self.hash_cache:
+            write_atomic(self.hash_cache, json.dumps(self.hashes, indent=1, sort_keys=True))
+
+    def store(self, chunks, brand_dir):
+        """Stream a PDF body to disk; returns its /datasheets/ URL (existing copy if identical)."""
+        digest = hashlib.sha256()
+        with AtomicFile(self.root / "incoming", "wb") as f:
+            for chunk in chunks:
+                digest.update(chunk)
+                f.write(chunk)
+            sha = digest.hexdigest()
+            with self.lock:
+                if sha in self.by_sha:
+                    self.reused += 1
+                    return self.by_sha[sha]
+                path = f.commit(self.root / brand_dir / f"{sha[:16]}.pdf")
+                st = path.stat()
+                self.hashes[path.relative_to(self.root).as_posix()] = {
+                    "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha,
+                }
+                self.by_sha[sha] = self.url_for(path)
+                self.downloaded += 1
+                return self.by_sha[sha]
+
+    def open(self, url):
+        """GET url (redirects followed): (response, first chunk, chunk iterator)."""
+        resp = self.http.get(url, timeout=20, stream=True)
+        resp.raise_for_status()
+        chunks = iter_capped(resp, self.max_bytes)
+        return resp, next(chunks, b""), chunks
+
+    def fetch_pdf(self, url, brand_dir):
+        with self.lock:
+            if url in self.by_pdf:
+                return self.by_pdf[url]
+        resp, head, chunks = self.open(url)
+        if not head.startswith(b"%PDF"):
+            resp.close()
+            raise NotAPdf(f"{url} is not a PDF ({resp.headers.get('Content-Type') or 'no content-type'})")
+        local = self.store(itertools.chain([head], chunks), brand_dir)
+        with self.lock:
+            self.by_pdf[url] = local
+        return local
+
+    def mirror(self, job):
+        """({sku: /datasheets/...}, failure reason or None) for one catalog URL.
+
+        A page may resolve for some of its SKUs only; the reason then covers the others.
+        """
+        url, skus, brand_dir = job['url'], job['skus'], job['brand_dir']
+        resp, head, chunks = self.open(url)
+        if head.startswith(b"%PDF"):
+            local = self.store(itertools.chain([head], chunks), brand_dir)
+            with self.lock:
+                self.by_pdf[resp.url] = local
+            return {sku: local for sku in skus}, None
+
+        content_type = resp.headers.get("Content-Type") or ""
+        if "html" not in content_type and not head.lstrip().startswith(b"<"):
+            resp.close()
+            return {}, f"ni PDF ni page HTML ({content_type or 'no content-type'})"
+        page = bytearray(head)
+        for chunk in chunks:
+            page.extend(chunk)
+            if len(page) > MAX_PAGE_BYTES:
+                resp.close()
+                break
+        links = [urljoin(resp.url, href) for href in PDF_LINK_RE.findall(page.decode(errors="ignore"))]
+        found, errors = {}, []
+        for sku in skus:
+            link = pick_pdf(links, sku)
+            if not link:
+                continue
+            try:
+                found[sku] = self.fetch_pdf(link, brand_dir)
+            except Exception as e:
+                errors.append(f"{link}: {e}")
+        if errors:
+            return found, "; ".join(errors[:3])
+        if len(found) < len(skus):
+            return found, f"page sans PDF correspondant ({len(links)} liens PDF)"
+        return found, None
+
+
+def catalog_jobs(products):
+    """One job per distinct remote datasheet URL: {url, skus, brand_dir}."""
+    jobs = {}
+    for product in products:
+        url = product.get("datasheet") or ""
+        if not url.startswith(("http://", "https://")):
+            continue
+        job = jobs.setdefault(url, {
+            'url': url, 'skus': [], 'brand_dir': slugify(product.get("brand") or "") or "other",
+        })
+        job['skus'].append(product.get("sku") or "")
+    return list(jobs.values())
+
+
+def rewrite_catalog(catalog_file, local):
+    """Point the catalog file at the local copies (streamed, atomic). Returns the links rewritten."""
+    rewritten = 0
+    with open(catalog_file, encoding="utf-8") as src, JsonArrayWriter(catalog_file) as out:
+        for product in iter_json_array(src):
+            path = local.get((product.get("datasheet"), product.get("sku") or ""))
+            if path:
+                product["datasheet"] = path
+                rewritten += 1
+            out.write(product)
+        if rewritten:
+            out.commit()
+    return rewritten
+
+
+def update_store(store, products, local):
+    """Same rewrite through the catalog store, then export. Returns the links rewritten."""
+    changes = {}
+    for product in products:
+        path = local.get((product.get("datasheet"), product.get("sku") or ""))
+        # Rows are addressed by SKU: products without one are left to the file run
+        if path and product.get("sku"):
+            changes[product["sku"]] = {"datasheet": path}
+    rewritten = store.update("zoho", changes, step="mirror")
+    try:
+        store.export("zoho")
+    except SourceChanged as e:
+        print(f"⚠️  {e}")
+    return rewritten
+
+
+def write_report(path, broken):
+    lines = [
+        "# Fiches techniques introuvables\n\n",
+        f"{len(broken)} liens du catalogue ne mènent à aucun PDF. "
+        "Ils sont conservés tels quels dans zoho-products.json.\n\n",
+    ]
+    for job, reason in sorted(broken, key=lambda b: b[0]['url']):
+        lines.append(f"- `{job['url']}` — {reason}\n")
+        lines.append(f"  - SKUs: {', '.join(job['skus'][:8])}{' …' if len(job['skus']) > 8 else ''}\n")
+    write_atomic(path, "".join(lines))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mirror catalog datasheets under public/datasheets/")
+    parser.add_argument("--catalog", type=Path, default=CATALOG_FILE, help="Catalog JSON array (default: zoho-products.json)")
+    parser.add_argument("--dir", type=Path, default=DATASHEETS_DIR, help="Datasheet tree (default: public/datasheets)")
+    parser.add_argument("--hash-cache", type=Path, default=HASH_CACHE_FILE,
+                        help="Size/mtime → sha256 cache of the hosted PDFs (default: .cache/datasheet-hashes.json)")
+    parser.add_argument("--store", type=Path, nargs="?", const=STORE_FILE, default=None,
+                        help=f"Update the SQLite catalog store instead, then export (default store: {STORE_FILE})")
+    parser.add_argument("--workers", type=int, default=WORKERS, help=f"URLs fetched concurrently (default: {WORKERS})")
+    parser.add_argument("--rate", type=float, default=RATE, help=f"Max requests/s per host (default: {RATE})")
+    parser.add_argument("--retries", type=int, default=RETRIES, help=f"Retries on 429/5xx/network errors (default: {RETRIES})")
+    parser.add_argument("--max-pdf-mb", type=float, default=MAX_PDF_MB, help=f"Abort PDFs larger than this (default: {MAX_PDF_MB})")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    http = HttpClient(
+        headers={"User-Agent": USER_AGENT, "Accept": "application/pdf,text/html;q=0.9,*/*;q=0.8"},
+        limiter=HostRateLimiter(rate=args.rate, burst=2),
+        pool_size=args.workers,
+        retries=args.retries,
+    )
+    mirror = Mirror(http, args.dir, int(args.max_pdf_mb * 1024 * 1024), hash_cache=args.hash_cache)
+
+    print("📄 SUNTREX Datasheet Mirror")
+    print("=" * 60)
+    # The store stays open for the whole run and is closed even if it fails
+    with CatalogStore(args.store) if args.store else contextlib.nullcontext() as store:
+        if store:
+            store.refresh("zoho", args.catalog)
+            products = store.products("zoho")
+            jobs = catalog_jobs(products)
+        else:
+            with open(args.catalog, encoding="utf-8") as f:
+                jobs = catalog_jobs(iter_json_array(f))
+        print(f"🔗 {sum(len(j['skus']) for j in jobs)} products link {len(jobs)} distinct remote URLs "
+              f"({len(mirror.by_sha)} PDFs already hosted, {mirror.hashed} hashed)")
+
+        def run(job):
+            try:
+                return mirror.mirror(job)
+            except Exception as e:
+                return {}, f"{type(e).__name__}: {e}"
+
+        local = {}    # (url, sku) → /datasheets/...
+        broken = []
+        for job, (found, reason) in run_concurrently(run, jobs, args.workers):
+            for sku, path in found.items():
+                local[(job['url'], sku)] = path
+            if found:
+                print(f"  ✅ {job['url']} → {len(set(found.values()))} PDF for {len(found)}/{len(job['skus'])} SKUs")
+            if reason:
+                broken.append(({**job, 'skus': [sku for sku in job['skus'] if sku not in found]}, reason))
+                print(f"  ❌ {job['url']} — {reason}")
+
+        # Rewrite the catalog (left untouched when nothing was mirrored)
+        if store:
+            rewritten = update_store(store, products, local)
+        else:
+            rewritten = rewrite_catalog(args.catalog, local)
+
+    report_path = args.dir / REPORT_NAME
+    write_report(report_path, broken)
+    mirror.save_hashes()
+
+    print(f"\n{'=' * 60}")
+    print("🎉 DONE!")
+    print(f"  📥 Downloaded: {mirror.downloaded} PDFs ({mirror.reused} duplicates of a stored file, not kept)")
+    print(f"  🔁 Catalog: {rewritten} datasheet links now local")
+    print(f"  ❌ Broken: {len(broken)} URLs → {report_path}")
+    net = http.stats.summary()
+    print(f"  🌐 HTTP: {net['requests']} requests, {net['retries']} retries, {net['errors']} errors")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
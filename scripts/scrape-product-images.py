@@ -3,14 +3,19 @@
 SUNTREX — Product Image Scraper
 Downloads product images from manufacturer websites.
 Groups variants by model family (many SKUs share the same photo).
+An interrupted run (Ctrl-C, crash) resumes where it stopped: every family
+outcome is journaled, and image-map.json is checkpointed during the run.
 
 Usage:
   cd ~/Downloads/suntrex
-  python3 scripts/scrape-product-images.py
+  python3 scripts/scrape-product-images.py [--workers 8] [--rate 0.67]
 
 Output:
-  public/products/{brand}/{sku-slug}.webp
-  public/products/image-map.json  (SKU → image path mapping)
+  public/products/{brand}/{family}.webp
+  public/products/{brand}/{family}-{width}.{hash}.{avif,webp}  (responsive ladder)
+  public/products/{brand}/placeholder-{category}.svg  (shared, SKU given as "label")
+  public/products/image-map.json  (SKU → {src, width, height, placeholder, sources})
+  public/products/PROPOSED-FAMILIES.md  (auto-clustered families for SKUs no rule covers)
 
 Requirements:
   pip3 install requests beautifulsoup4 Pillow
@@ -19,26 +24,27 @@ Requirements:
 import os
 import re
 import json
-import time
-import hashlib
-import requests
+import argparse
+import itertools
+import threading
 from pathlib import Path
 from urllib.parse import quote_plus
-from io import BytesIO
 
-try:
-    from PIL import Image
-    HAS_PIL = True
-except ImportError:
-    HAS_PIL = False
-    print("⚠️  Pillow not installed. Images won't be resized. Run: pip3 install Pillow")
+from atomic_file import write_atomic
+from catalog import load_catalog
+from catalog_store import STORE_FILE, CatalogStore, SourceChanged, UnexportedChanges
+from family_cluster import propose_families, report as proposed_families_report
+from family_matcher import FamilyMatcher
+from image_cache import ImageCache, NegativeCache
+from scrape_journal import ScrapeJournal
+from image_transcode import HAS_PIL, TranscodeStage, available_formats, sniff_image_type
+from scraper_net import HostRateLimiter, HttpClient, is_permanent_failure, iter_capped, run_concurrently
 
 try:
     from bs4 import BeautifulSoup
     HAS_BS4 = True
 except ImportError:
     HAS_BS4 = False
-    print("⚠️  BeautifulSoup not installed. Run: pip3 install beautifulsoup4")
 
 # ═══════════════════════════════════════════════════════════════
 # CONFIG
@@ -48,9 +54,28 @@ PROJECT_DIR = Path.home() / "Downloads" / "suntrex"
 OUTPUT_DIR = PROJECT_DIR / "public" / "products"
 CATALOG_FILE = PROJECT_DIR / "suntrex-catalog.json"
 IMAGE_MAP_FILE = OUTPUT_DIR / "image-map.json"
+REPORT_FILE = OUTPUT_DIR / "MANUAL-IMAGES-NEEDED.md"
+PROPOSED_FAMILIES_FILE = OUTPUT_DIR / "PROPOSED-FAMILIES.md"  # Auto-clustered families to review
+JOURNAL_FILE = PROJECT_DIR / ".cache" / "scrape-journal.ndjson"  # Resume point of an interrupted run
+CHECKPOINT_SECONDS = 10  # image-map.json / report are rewritten at most this often during a run
+IMAGE_CACHE_DIR = PROJECT_DIR / ".cache" / "images"  # Original downloads, by SHA-256
+IMAGE_CACHE_MB = 512  # LRU-evicted beyond this size
+FAILED_TTL_DAYS = 7  # Failed searches / dead URLs are not retried before this
 MAX_SIZE = (600, 600)  # Max image dimensions
 QUALITY = 85
-DELAY = 1.5  # Seconds between requests (be polite)
+SIZES = (160, 320, 600)  # Responsive ladder (max px per side), for srcset
+FORMATS = ("avif", "webp")  # Variant formats, most efficient first (<picture> order)
+AVIF_QUALITY = 60  # AVIF looks like WebP q85 at a much lower quality setting
+MAX_IMAGE_MB = 15  # Downloads above this are aborted (press kits, mislabelled files)
+# "shared": one SVG per (brand, category), the SKU label is carried by image-map.json
+# "per-sku": one SVG per SKU with the label baked in (thousands of files on a big catalog)
+PLACEHOLDERS = "shared"
+AUTO_FAMILIES = False  # Fetch images for proposed families before they are reviewed (see --auto-families)
+DELAY = 1.5  # Min seconds between requests to the same host (be polite)
+WORKERS = 8  # Families fetched concurrently
+TRANSCODERS = os.cpu_count() or 1  # Processes decoding/resizing/encoding images
+TRANSCODE_QUEUE = 16  # Fetched originals waiting for a transcoder (backpressure)
+RETRIES = 3  # Retries on 429/5xx/connection errors (exponential backoff)
 USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
 
 HEADERS = {
@@ -59,6 +84,18 @@ HEADERS = {
     "Accept-Language": "en-US,en;q=0.5",
 }
 
+# Search endpoints (overridable, e.g. to point at a local HTTP stand-in)
+GOOGLE_SEARCH_URL = "https://www.google.com/search?tbm=isch&q={query}"
+BING_SEARCH_URL = "https://www.bing.com/images/search?q={query}&first=1"
+
+MAX_IMAGE_BYTES = int(MAX_IMAGE_MB * 1024 * 1024)
+
+# Set up by main(), not at import: the spawned transcoding workers re-import
+# this script and must not open connections or load the caches again.
+HTTP = None         # Shared pooled HTTP client, per-host token bucket politeness
+IMAGE_CACHE = None  # Original downloads (content-addressed, ETag/Last-Modified aware)
+FAILURES = None     # Negative cache: dead URLs / empty searches
+
 # ═══════════════════════════════════════════════════════════════
 # MODEL FAMILIES — Group SKUs that share the same product photo
 # ═══════════════════════════════════════════════════════════════
@@ -350,38 +387,109 @@ def slugify(text):
     return text[:80]
 
 
-def download_image(url, save_path, resize=True):
-    """Download image from URL and optionally resize."""
+def render_key():
+    """Settings a WebP was rendered with; a change triggers regeneration from the cache."""
+    if not HAS_PIL:
+        return "original"
+    ladder = "-".join(str(size) for size in SIZES)
+    return f"{MAX_SIZE[0]}x{MAX_SIZE[1]}-q{QUALITY}-{ladder}-{'+'.join(FORMATS)}-avif{AVIF_QUALITY}"
+
+
+def variants_present(save_path, manifest):
+    """True when every ladder file listed in manifest is still on disk."""
+    return all(
+        (Path(save_path).parent / variant['file']).exists()
+        for source in manifest.get('sources', [])
+        for variant in source['variants']
+    )
+
+
+def image_entry(rel_path, manifest=None):
+    """image-map.json entry: src plus srcset-ready sources when variants exist."""
+    entry = {"src": rel_path}
+    if not manifest:
+        return entry
+    base = rel_path.rsplit('/', 1)[0]
+    entry.update(width=manifest['width'], height=manifest['height'], placeholder=manifest['placeholder'])
+    sources = []
+    for source in manifest.get('sources', []):
+        variants = [
+            {"src": f"{base}/{v['file']}", "width": v['width'], "height": v['height'], "bytes": v['bytes']}
+            for v in source['variants']
+        ]
+        sources.append({
+            "type": source['type'],
+            "srcset": ", ".join(f"{v['src']} {v['width']}w" for v in variants),
+            "variants": variants,
+        })
+    if sources:
+        entry["sources"] = sources
+    return entry
+
+
+def upgrade_entry(sku, value):
+    """image-map.json entry from a map written before the srcset entries,
+    whose values were bare src strings (shared placeholders get their label)."""
+    if not isinstance(value, str):
+        return value
+    entry = image_entry(value)
+    if value.rsplit('/', 1)[-1].startswith('placeholder-'):
+        entry['label'] = sku
+    return entry
+
+
+class NotAnImage(ValueError):
+    """The body does not start with the signature of an image format."""
+
+
+def fetch_original(url):
+    """Stream url into the image cache, via a conditional request when it is cached.
+
+    The body is never held in memory: the first chunk is sniffed for an
+    image signature (so a mislabelled PDF or HTML page is dropped right
+    away, whatever its Content-Type), and the download is aborted past
+    MAX_IMAGE_BYTES. A 304 answer reuses the cached original. Returns the
+    sha256 of the original.
+    """
+    cached = IMAGE_CACHE.lookup(url)
+    resp = HTTP.get(url, timeout=15, stream=True, headers=IMAGE_CACHE.conditional_headers(url))
+    if resp.status_code == 304:
+        resp.close()
+        if cached and IMAGE_CACHE.touch(cached['sha256']):
+            return cached['sha256']
+        resp = HTTP.get(url, timeout=15, stream=True)
+    resp.raise_for_status()
+    
+    chunks = iter_capped(resp, MAX_IMAGE_BYTES)
+    head = next(chunks, b'')
+    if not sniff_image_type(head):
+        resp.close()
+        content_type = resp.headers.get('content-type') or 'no content-type'
+        raise NotAnImage(f"not an image ({content_type}, starts with {head[:8]!r})")
+    return IMAGE_CACHE.store(url, itertools.chain([head], chunks), resp.headers)
+
+
+def output_key(save_path):
+    return Path(save_path).relative_to(OUTPUT_DIR).as_posix()
+
+
+def fetch_candidate(url, log=print):
+    """Fetch one candidate image URL into the image cache; returns its sha256 or None."""
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=15, stream=True)
-        resp.raise_for_status()
-        
-        content_type = resp.headers.get('content-type', '')
-        if 'image' not in content_type and 'octet-stream' not in content_type:
-            return False
-        
-        if HAS_PIL and resize:
-            img = Image.open(BytesIO(resp.content))
-            # Convert to RGB if needed (for WebP output)
-            if img.mode in ('RGBA', 'P'):
-                img = img.convert('RGBA')
-                # White background for transparency
-                bg = Image.new('RGBA', img.size, (255, 255, 255, 255))
-                bg.paste(img, mask=img.split()[3])
-                img = bg.convert('RGB')
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            img.thumbnail(MAX_SIZE, Image.LANCZOS)
-            img.save(save_path, 'WEBP', quality=QUALITY)
-        else:
-            with open(save_path, 'wb') as f:
-                f.write(resp.content)
-        
-        return True
+        sha = fetch_original(url)
+        FAILURES.clear('urls', url)
+        return sha
     except Exception as e:
-        print(f"    ❌ Download failed: {e}")
-        return False
+        log(f"    ❌ Download failed: {e}")
+        if is_permanent_failure(e):
+            FAILURES.record('urls', url, f"{type(e).__name__}: {e}")
+        return None
+
+
+def queue_transcode(stage, key, sha, save_path):
+    """Hand a cached original over to the transcoding stage."""
+    stage.submit(key, IMAGE_CACHE.blob_path(sha), save_path, MAX_SIZE, QUALITY,
+                 sizes=SIZES, formats=FORMATS, qualities={"avif": AVIF_QUALITY})
 
 
 def search_google_images(query, num=3):
@@ -389,9 +497,9 @@ def search_google_images(query, num=3):
     if not HAS_BS4:
         return []
     
-    search_url = f"https://www.google.com/search?tbm=isch&q={quote_plus(query)}"
+    search_url = GOOGLE_SEARCH_URL.format(query=quote_plus(query))
     try:
-        resp = requests.get(search_url, headers=HEADERS, timeout=10)
+        resp = HTTP.get(search_url, timeout=10)
         soup = BeautifulSoup(resp.text, 'html.parser')
         
         # Extract image URLs from Google results
@@ -409,19 +517,29 @@ def search_google_images(query, num=3):
 
 
 def search_bing_images(query, num=3):
-    """Search Bing Images as fallback."""
-    search_url = f"https://www.bing.com/images/search?q={quote_plus(query)}&first=1"
+    """Search Bing Images as fallback.
+
+    Returns None when the search itself failed (network, non-200), so that
+    only a real "no results" ends up in the negative cache.
+    """
+    search_url = BING_SEARCH_URL.format(query=quote_plus(query))
     try:
-        resp = requests.get(search_url, headers=HEADERS, timeout=10)
+        resp = HTTP.get(search_url, timeout=10)
+        if not resp.ok:
+            return None
         # Extract image URLs from thumbnail data attributes
         urls = re.findall(r'murl&quot;:&quot;(https?://[^&]+?)&quot;', resp.text)
         return urls[:num]
     except Exception:
-        return []
+        return None
 
 
 def generate_placeholder_svg(brand, category, sku, save_path):
-    """Generate a branded placeholder SVG for products without images."""
+    """Generate a branded placeholder SVG for products without images.
+
+    With sku=None the SKU line is left out, so the file can be shared by a
+    whole (brand, category); the label then comes from image-map.json.
+    """
     colors = {
         'HUAWEI': ('#e4002b', '#fff'),
         'DEYE': ('#0068b7', '#fff'),
@@ -437,20 +555,22 @@ def generate_placeholder_svg(brand, category, sku, save_path):
     bg, fg = colors.get(brand, ('#666', '#fff'))
     
     icons = {
-        'inverters': '⚡', 'batteries': '🔋', 'solar_panels': '☀️',
-        'mounting': '🔧', 'cables': '🔌', 'micro_inverters': '⚡',
-        'monitoring': '📡', 'optimizers': '📊', 'ev_charging': '🔌',
-        'accessories': '🛠️',
+        'inverters': '⚡', 'batteries': '🔋', 'panels': '☀️',
+        'mounting': '🔧', 'electrical': '🔌', 'optimizers': '📊',
+        'ev-chargers': '🔌', 'accessories': '🛠️',
     }
     icon = icons.get(category, '📦')
+    sku_line = (
+        f'  <text x="200" y="250" text-anchor="middle" font-family="Inter,system-ui,sans-serif" '
+        f'font-size="12" fill="#64748b">{sku}</text>\n'
+    ) if sku else ''
     
     svg = f'''<svg xmlns="http://www.w3.org/2000/svg" width="400" height="400" viewBox="0 0 400 400">
   <rect width="400" height="400" fill="#f8f9fa" rx="12"/>
   <rect x="20" y="20" width="360" height="360" fill="{bg}" opacity="0.08" rx="8"/>
   <text x="200" y="160" text-anchor="middle" font-size="64">{icon}</text>
   <text x="200" y="220" text-anchor="middle" font-family="Inter,system-ui,sans-serif" font-size="18" font-weight="700" fill="{bg}">{brand}</text>
-  <text x="200" y="250" text-anchor="middle" font-family="Inter,system-ui,sans-serif" font-size="12" fill="#64748b">{sku}</text>
-  <text x="200" y="340" text-anchor="middle" font-family="Inter,system-ui,sans-serif" font-size="11" fill="#94a3b8">Image bientôt disponible</text>
+{sku_line}  <text x="200" y="340" text-anchor="middle" font-family="Inter,system-ui,sans-serif" font-size="11" fill="#94a3b8">Image bientôt disponible</text>
 </svg>'''
     
     with open(save_path, 'w') as f:
@@ -462,18 +582,196 @@ def generate_placeholder_svg(brand, category, sku, save_path):
 # MAIN SCRAPER
 # ═══════════════════════════════════════════════════════════════
 
-def main():
+def cached_failure(job):
+    """Why this family is not worth fetching now, or None.
+
+    A family is skipped only while every avenue (known URL and search) is in
+    the negative cache.
+    """
+    family_id, family = job['family_id'], job['family']
+    reasons = []
+    if family_id in KNOWN_IMAGES:
+        entry = FAILURES.failed('urls', KNOWN_IMAGES[family_id])
+        if not entry:
+            return None
+        reasons.append(entry['reason'])
+    if family.get('search'):
+        entry = FAILURES.failed('searches', family['search'])
+        if not entry:
+            return None
+        reasons.append(entry['reason'])
+    return "; ".join(reasons) or None
+
+
+def fetch_family_image(job):
+    """Try the known URL, then Bing results, for one family (runs in a worker).
+
+    Only fetches: returns (sha256 of the original or None, log lines) and
+    leaves rendering to the transcoding stage. Log lines are returned so
+    output from concurrent families is not interleaved. Dead URLs and empty
+    searches from the negative cache are skipped; new ones are recorded.
+    """
+    family_id, family = job['family_id'], job['family']
+    log = [f"  🔍 {family_id} ({len(job['skus'])} SKUs) — searching..."]
+    sha = None
+    
+    # Try known direct URLs first
+    known_url = KNOWN_IMAGES.get(family_id)
+    if known_url and not FAILURES.failed('urls', known_url):
+        log.append("    → Trying known URL...")
+        sha = fetch_candidate(known_url, log=log.append)
+    
+    # Try Bing image search
+    query = family.get('search')
+    if not sha and query and not FAILURES.failed('searches', query):
+        log.append(f"    → Searching: {query[:50]}...")
+        urls = search_bing_images(query)
+        if urls == []:
+            FAILURES.record('searches', query, "no results")
+        for url in urls or []:
+            if FAILURES.failed('urls', url):
+                continue
+            sha = fetch_candidate(url, log=log.append)
+            if sha:
+                break
+        if urls and not sha and all(FAILURES.failed('urls', url) for url in urls):
+            FAILURES.record('searches', query, f"all {len(urls)} candidates failed")
+    
+    if sha:
+        if query:
+            FAILURES.clear('searches', query)
+        log.append("    ✅ Downloaded!")
+    return sha, log
+
+
+def transcode_cached(args):
+    """--transcode-only: re-render every recorded WebP from its cached original."""
+    stage = TranscodeStage(args.transcoders, args.transcode_queue)
+    outputs = {}
+    missing = 0
+    for key, record in list(IMAGE_CACHE.outputs.items()):
+        if IMAGE_CACHE.touch(record['sha256']):
+            (OUTPUT_DIR / key).parent.mkdir(parents=True, exist_ok=True)
+            queue_transcode(stage, key, record['sha256'], OUTPUT_DIR / key)
+            outputs[key] = record['sha256']
+        else:
+            missing += 1
+    
+    results = stage.close()
+    done = 0
+    for key, sha in outputs.items():
+        manifest, error = results.get(key, (None, "not transcoded"))
+        if error:
+            print(f"  ❌ {key} — {error}")
+        else:
+            IMAGE_CACHE.record_output(key, sha, render_key(), manifest)
+            done += 1
+    IMAGE_CACHE.save()
+    
+    print(f"♻️  {done}/{len(outputs)} images re-rendered ({render_key()}) with {stage.workers} processes")
+    if missing:
+        print(f"⚠️  {missing} images have no cached original (evicted) — run a normal scrape")
+
+
+def write_manual_report(path, family_ids, groups, families):
+    """MANUAL-IMAGES-NEEDED.md for the families left with a placeholder."""
+    lines = [
+        "# Images à télécharger manuellement\n\n",
+        "Ces familles de produits n'ont pas pu être scrapées automatiquement.\n",
+        "Téléchargez les images depuis les sites fabricants et placez-les dans le bon dossier.\n\n",
+    ]
+    for family_id, family in families.items():
+        if family_id in family_ids:
+            family_skus = groups.family_skus[family_id]
+            brand = groups.brand.get(family_skus[0]) or '?'
+            lines.append(f"## {brand} — {family_id}\n")
+            lines.append(f"- Recherche Google: `{family.get('search', 'N/A')}`\n")
+            lines.append(f"- SKUs concernés: {', '.join(family_skus[:5])}\n")
+            lines.append(f"- Destination: `public/products/{slugify(brand)}/{family_id}.webp`\n\n")
+    write_atomic(path, "".join(lines))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="SUNTREX product image scraper")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help=f"Families fetched concurrently (default: {WORKERS})")
+    parser.add_argument("--rate", type=float, default=1 / DELAY,
+                        help=f"Max requests/s per host (default: {1 / DELAY:.2f})")
+    parser.add_argument("--burst", type=int, default=2, help="Requests a host may burst (default: 2)")
+    parser.add_argument("--retries", type=int, default=RETRIES,
+                        help=f"Retries on 429/5xx/network errors (default: {RETRIES})")
+    parser.add_argument("--pool-size", type=int, default=None,
+                        help="Keep-alive connections per host (default: --workers)")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Ignore the negative cache and retry failed searches / dead URLs")
+    parser.add_argument("--failed-ttl-days", type=float, default=FAILED_TTL_DAYS,
+                        help=f"How long failures are remembered (default: {FAILED_TTL_DAYS})")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                        help=f"Responsive ladder in px, comma-separated (default: {','.join(map(str, SIZES))})")
+    parser.add_argument("--formats", default=",".join(FORMATS),
+                        help=f"Variant formats, comma-separated (default: {','.join(FORMATS)})")
+    parser.add_argument("--max-image-mb", type=float, default=MAX_IMAGE_MB,
+                        help=f"Abort downloads larger than this (default: {MAX_IMAGE_MB})")
+    parser.add_argument("--placeholders", choices=("shared", "per-sku"), default=PLACEHOLDERS,
+                        help=f"Placeholder SVGs per (brand, category) or per SKU (default: {PLACEHOLDERS})")
+    parser.add_argument("--auto-families", action="store_true", default=AUTO_FAMILIES,
+                        help="Also fetch images for the proposed families of unmatched SKUs, without "
+                             "waiting for them to be reviewed (default: only report them)")
+    parser.add_argument("--transcoders", type=int, default=TRANSCODERS,
+                        help=f"Transcoding processes (default: {TRANSCODERS})")
+    parser.add_argument("--transcode-queue", type=int, default=TRANSCODE_QUEUE,
+                        help=f"Fetched images waiting for a transcoder (default: {TRANSCODE_QUEUE})")
+    parser.add_argument("--transcode-only", action="store_true",
+                        help="Only re-render every WebP from the cached originals (no network)")
+    parser.add_argument("--checkpoint-seconds", type=float, default=CHECKPOINT_SECONDS,
+                        help=f"Rewrite image-map.json / report during the run at most this often "
+                             f"(default: {CHECKPOINT_SECONDS})")
+    parser.add_argument("--store", type=Path, nargs="?", const=STORE_FILE, default=None,
+                        help=f"Also record each SKU's family and image in the SQLite catalog store, "
+                             f"then export it to suntrex-catalog.json (default store: {STORE_FILE})")
+    parser.add_argument("--image-cache-mb", type=int, default=IMAGE_CACHE_MB,
+                        help=f"Size limit of the original-image cache (default: {IMAGE_CACHE_MB})")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    global HTTP, IMAGE_CACHE, FAILURES, SIZES, FORMATS, MAX_IMAGE_BYTES
+    args = parse_args(argv)
+    if not HAS_PIL:
+        print("⚠️  Pillow not installed. Images won't be resized. Run: pip3 install Pillow")
+    if not HAS_BS4:
+        print("⚠️  BeautifulSoup not installed. Run: pip3 install beautifulsoup4")
+    MAX_IMAGE_BYTES = int(args.max_image_mb * 1024 * 1024)
+    SIZES = tuple(int(size) for size in args.sizes.split(",") if size)
+    FORMATS = tuple(available_formats(fmt for fmt in args.formats.split(",") if fmt))
+    missing_formats = set(args.formats.split(",")) - set(FORMATS) - {""}
+    if HAS_PIL and missing_formats:
+        print(f"⚠️  Pillow cannot encode {', '.join(sorted(missing_formats))} here — skipped "
+              f"(AVIF needs Pillow ≥ 11.2 built with libavif)")
+    HTTP = HttpClient(
+        headers=HEADERS,
+        limiter=HostRateLimiter(rate=args.rate, burst=args.burst),
+        pool_size=args.pool_size or args.workers,
+        retries=args.retries,
+    )
+    IMAGE_CACHE = ImageCache(IMAGE_CACHE_DIR, max_bytes=args.image_cache_mb * 1024 * 1024)
+    FAILURES = NegativeCache(IMAGE_CACHE_DIR / "failures.json",
+                             ttl_seconds=args.failed_ttl_days * 86400, ignore=args.retry_failed)
+    
     print("🖼️  SUNTREX Product Image Scraper")
     print("=" * 60)
     
+    if args.transcode_only:
+        return transcode_cached(args)
+    
     # Load catalog
     if not CATALOG_FILE.exists():
         print(f"❌ Catalog not found: {CATALOG_FILE}")
         print("   Run the catalog parser first or place suntrex-catalog.json in the project root.")
         return
     
-    with open(CATALOG_FILE) as f:
-        catalog = json.load(f)
+    # Brands and categories normalised (catalog.py), snapshot-cached between runs
+    catalog = load_catalog(CATALOG_FILE)
     
     print(f"📦 {len(catalog)} products loaded")
     
@@ -483,140 +781,271 @@ def main():
     for bd in brands_dirs:
         (OUTPUT_DIR / bd).mkdir(exist_ok=True)
     
-    # Map each SKU to a model family
-    sku_to_family = {}
-    for family_id, family in MODEL_FAMILIES.items():
-        pattern = re.compile(family['pattern'], re.IGNORECASE)
-        for product in catalog:
-            if pattern.search(product['sku']):
-                sku_to_family[product['sku']] = family_id
+    # Map each SKU to a model family (one pass, prefix-dispatched)
+    groups = FamilyMatcher(MODEL_FAMILIES).group(catalog)
+    sku_to_family = groups.sku_to_family
     
     # Stats
     matched = len(sku_to_family)
-    unmatched = len(catalog) - matched
     print(f"🔗 {matched} SKUs matched to {len(MODEL_FAMILIES)} model families")
-    print(f"❓ {unmatched} SKUs unmatched (will get placeholders)")
+    if groups.overlaps:
+        print(f"⚠️  {len(groups.overlaps)} SKUs match several families (last rule wins):")
+        for sku, family_ids in groups.overlaps.items():
+            print(f"     {sku}: {' > '.join(family_ids[:-1])} → {family_ids[-1]}")
+    
+    # Cluster what no hand rule covers into proposed families (hand rules
+    # always win: only unmatched SKUs are clustered). They are only reported
+    # for review, unless --auto-families fetches one image per family. A proposal that also matches SKUs of a hand family is a missing
+    # variant of it and shares its image.
+    proposed = propose_families(
+        [p for p in catalog if p['sku'] not in sku_to_family], slugify,
+        claimed=sku_to_family, taken=MODEL_FAMILIES,
+    )
+    families = dict(MODEL_FAMILIES)
+    if args.auto_families:
+        for family in proposed:
+            if family.extends:
+                groups.add_family(family.extends, family.skus)
+            else:
+                families[family.family_id] = family.rule()
+                groups.add_family(family.family_id, family.skus)
+    write_atomic(PROPOSED_FAMILIES_FILE, proposed_families_report(proposed, fetched=args.auto_families))
+    clustered = sum(len(f.skus) for f in proposed)
+    print(f"🧩 {len(proposed)} families proposed for {clustered} unmatched SKUs"
+          f"{'' if args.auto_families else ' (to review, not used without --auto-families)'}"
+          f" → {PROPOSED_FAMILIES_FILE}")
+    print(f"❓ {len(catalog) - len(sku_to_family)} SKUs unmatched (will get placeholders)")
     print()
     
     # Download one image per family
-    image_map = {}  # SKU → relative image path
-    family_images = {}  # family_id → image path
+    image_map = {}  # SKU → image-map.json entry
     
     downloaded = 0
     placeholders = 0
     failed = 0
     
+    # Placeholders: shared ones are written once per (brand, category) and run
+    written_placeholders = set()
+    
+    def placeholder(brand, category, sku, per_sku_stem):
+        brand_slug = slugify(brand)
+        if args.placeholders == "per-sku":
+            svg_path = OUTPUT_DIR / brand_slug / f"{per_sku_stem}.svg"
+            if svg_path not in written_placeholders:
+                generate_placeholder_svg(brand, category, sku, svg_path)
+                written_placeholders.add(svg_path)
+            return image_entry(f"/products/{brand_slug}/{per_sku_stem}.svg")
+        
+        name = f"placeholder-{slugify(category or 'accessories')}.svg"
+        svg_path = OUTPUT_DIR / brand_slug / name
+        if svg_path not in written_placeholders:
+            generate_placeholder_svg(brand, category, None, svg_path)
+            written_placeholders.add(svg_path)
+        return {**image_entry(f"/products/{brand_slug}/{name}"), "label": sku}
+    
     # Phase 1: Download family images
-    print("━━━ Phase 1: Downloading family images ━━━")
-    for family_id, family in MODEL_FAMILIES.items():
+    print(f"━━━ Phase 1: Downloading family images ({args.workers} workers) ━━━")
+    family_jobs = []
+    for family_id, family in families.items():
         # Find SKUs in this family
-        family_skus = [sku for sku, fid in sku_to_family.items() if fid == family_id]
+        family_skus = groups.family_skus.get(family_id)
         if not family_skus:
             continue
         
         # Get brand from first matching product
-        brand = next((p['brand'] for p in catalog if p['sku'] == family_skus[0]), 'unknown')
+        brand = groups.brand.get(family_skus[0]) or 'unknown'
         brand_slug = slugify(brand)
         img_filename = f"{family_id}.webp"
-        img_path = OUTPUT_DIR / brand_slug / img_filename
-        rel_path = f"/products/{brand_slug}/{img_filename}"
-        
-        if img_path.exists():
-            print(f"  ✅ {family_id} — already exists ({len(family_skus)} SKUs)")
-            family_images[family_id] = rel_path
-            for sku in family_skus:
-                image_map[sku] = rel_path
-            downloaded += 1
+        family_jobs.append({
+            'family_id': family_id,
+            'family': family,
+            'skus': family_skus,
+            'brand': brand,
+            'brand_slug': brand_slug,
+            'img_path': OUTPUT_DIR / brand_slug / img_filename,
+            'rel_path': f"/products/{brand_slug}/{img_filename}",
+        })
+    
+    # Resume an interrupted run: families with an outcome in the journal are
+    # not fetched again (failed ones keep their placeholder until the run
+    # completes; --retry-failed on a later run retries them).
+    settings = {"render": render_key(), "placeholders": args.placeholders, "auto_families": args.auto_families}
+    journal = ScrapeJournal(JOURNAL_FILE, interval=args.checkpoint_seconds)
+    resumed = journal.resume(settings)
+    journal.begin(settings)
+    if resumed:
+        print(f"↩️  Resuming interrupted run: {len(resumed)} families already done ({JOURNAL_FILE})")
+    
+    jobs_by_id = {job['family_id']: job for job in family_jobs}
+    outcomes = {}  # family_id → True (image) / False (placeholder)
+    lock = threading.RLock()
+    previous_map = {}
+    if IMAGE_MAP_FILE.exists():
+        try:
+            with open(IMAGE_MAP_FILE, encoding='utf-8') as f:
+                previous_map = {sku: upgrade_entry(sku, value) for sku, value in json.load(f).items()}
+        except ValueError:
+            pass
+    
+    def family_entries(job, ok):
+        """image-map.json entries for the SKUs of one family."""
+        if ok:
+            record = IMAGE_CACHE.output(output_key(job['img_path'])) or {}
+            entry = image_entry(job['rel_path'], record.get('manifest'))
+            return {sku: entry for sku in job['skus']}
+        # Placeholder (labelled with each SKU when shared)
+        category = groups.category.get(job['skus'][0]) or 'accessories'
+        return {sku: placeholder(job['brand'], category, sku, job['family_id']) for sku in job['skus']}
+    
+    def checkpoint():
+        """Partial image-map.json and report: the previous map updated with the outcomes so far."""
+        partial = dict(previous_map)
+        for family_id, ok in outcomes.items():
+            partial.update(family_entries(jobs_by_id[family_id], ok))
+        write_atomic(IMAGE_MAP_FILE, json.dumps(partial, ensure_ascii=False, indent=2))
+        write_manual_report(REPORT_FILE, {fid for fid, ok in outcomes.items() if not ok}, groups, families)
+        IMAGE_CACHE.save()
+        FAILURES.save()
+        journal.sync()
+    
+    def done(job, ok, sha=None, manifest=None):
+        """Journal one family outcome (any thread); checkpoint every --checkpoint-seconds."""
+        with lock:
+            outcomes[job['family_id']] = ok
+            if journal.record(job['family_id'], ok, sha, manifest):
+                checkpoint()
+    
+    def transcoded(family_id, manifest, error):
+        job = jobs_by_id[family_id]
+        if error:
+            print(f"  ❌ {family_id} — transcoding failed: {error}")
+        else:
+            IMAGE_CACHE.record_output(output_key(job['img_path']), pending[family_id], render_key(), manifest)
+        done(job, error is None, pending[family_id], manifest)
+    
+    # Reuse what is on disk: an up-to-date WebP (and its variants) is kept, a
+    # missing or stale one (MAX_SIZE/QUALITY/ladder changed) is re-rendered
+    # from the cached original.
+    # WebPs from before the cache existed have no record and are kept as is.
+    stage = TranscodeStage(args.transcoders, args.transcode_queue, on_done=transcoded)
+    existing = set()
+    pending = {}  # family_id → sha256 of the original being transcoded
+    to_fetch = []
+    regenerated = 0
+    skipped = 0
+    for job in family_jobs:
+        previous = resumed.get(job['family_id'])
+        if previous and (not previous['ok'] or job['img_path'].exists()):
+            if previous.get('sha256'):
+                IMAGE_CACHE.record_output(output_key(job['img_path']), previous['sha256'], render_key(),
+                                          previous['manifest'])
+            outcomes[job['family_id']] = previous['ok']
             continue
-        
-        print(f"  🔍 {family_id} ({len(family_skus)} SKUs) — searching...")
-        
-        success = False
-        
-        # Try known direct URLs first
-        if family_id in KNOWN_IMAGES:
-            print(f"    → Trying known URL...")
-            success = download_image(KNOWN_IMAGES[family_id], img_path)
-        
-        # Try Bing image search
-        if not success and family.get('search'):
-            print(f"    → Searching: {family['search'][:50]}...")
-            urls = search_bing_images(family['search'])
-            for url in urls:
-                if download_image(url, img_path):
-                    success = True
-                    break
-                time.sleep(0.5)
-        
-        if success:
-            print(f"    ✅ Downloaded!")
-            family_images[family_id] = rel_path
-            for sku in family_skus:
-                image_map[sku] = rel_path
+        record = IMAGE_CACHE.output(output_key(job['img_path']))
+        if job['img_path'].exists() and (
+            record is None
+            or (record['render'] == render_key() and variants_present(job['img_path'], record.get('manifest', {})))
+        ):
+            existing.add(job['family_id'])
+            done(job, True)
+            continue
+        if record and IMAGE_CACHE.touch(record['sha256']):
+            print(f"  ♻️  {job['family_id']} — regenerating from cache")
+            pending[job['family_id']] = record['sha256']
+            queue_transcode(stage, job['family_id'], record['sha256'], job['img_path'])
+            regenerated += 1
+        elif cached_failure(job):
+            print(f"  ⏭️  {job['family_id']} — failed recently ({cached_failure(job)}), skipped "
+                  f"(--retry-failed to force)")
+            done(job, False)
+            skipped += 1
+        else:
+            to_fetch.append(job)
+    
+    # Fetch missing family images concurrently; politeness is per host (HTTP.limiter).
+    # Originals go straight to the transcoding processes, so CPU-bound
+    # encoding never holds up the next fetch.
+    def fetch_and_queue(job):
+        sha, log = fetch_family_image(job)
+        if sha:
+            pending[job['family_id']] = sha
+            queue_transcode(stage, job['family_id'], sha, job['img_path'])
+        return sha, log
+    
+    try:
+        for job, (sha, log) in run_concurrently(fetch_and_queue, to_fetch, args.workers):
+            print("\n".join(log))
+            if not sha:
+                done(job, False)
+        stage.close()
+    except KeyboardInterrupt:
+        stage.cancel()
+        with lock:
+            checkpoint()
+        print(f"\n⏸️  Interrupted — {len(outcomes)}/{len(family_jobs)} families done, "
+              f"run again to resume ({JOURNAL_FILE})")
+        return 130
+    
+    for job in family_jobs:
+        family_id = job['family_id']
+        if outcomes.get(family_id):
+            if family_id in existing:
+                print(f"  ✅ {family_id} — already exists ({len(job['skus'])} SKUs)")
             downloaded += 1
         else:
-            # Generate placeholder
-            svg_path = OUTPUT_DIR / brand_slug / f"{family_id}.svg"
-            category = next((p['category'] for p in catalog if p['sku'] == family_skus[0]), 'accessories')
-            generate_placeholder_svg(brand, category, family_skus[0], svg_path)
-            svg_rel = f"/products/{brand_slug}/{family_id}.svg"
-            family_images[family_id] = svg_rel
-            for sku in family_skus:
-                image_map[sku] = svg_rel
             placeholders += 1
-            print(f"    📎 Placeholder generated")
-        
-        time.sleep(DELAY)
+            print(f"  📎 {family_id} — placeholder generated")
+        image_map.update(family_entries(job, outcomes.get(family_id, False)))
     
     # Phase 2: Handle unmatched SKUs (placeholder only)
     print(f"\n━━━ Phase 2: Generating placeholders for unmatched SKUs ━━━")
     for product in catalog:
         if product['sku'] not in image_map:
-            brand_slug = slugify(product['brand'])
-            sku_slug = slugify(product['sku'])
-            svg_path = OUTPUT_DIR / brand_slug / f"{sku_slug}.svg"
-            
-            if not svg_path.exists():
-                generate_placeholder_svg(
-                    product['brand'], 
-                    product['category'], 
-                    product['sku'], 
-                    svg_path
-                )
-            
-            image_map[product['sku']] = f"/products/{brand_slug}/{sku_slug}.svg"
+            image_map[product['sku']] = placeholder(
+                product['brand'], product['category'], product['sku'], slugify(product['sku'])
+            )
             placeholders += 1
     
-    # Save image map
-    with open(IMAGE_MAP_FILE, 'w', encoding='utf-8') as f:
-        json.dump(image_map, f, ensure_ascii=False, indent=2)
+    # Save image map (atomically: readers never see a half-written file)
+    write_atomic(IMAGE_MAP_FILE, json.dumps(image_map, ensure_ascii=False, indent=2))
+    if args.store:
+        # Row updates only: other steps (enrich-datasheets --store) may write concurrently
+        with CatalogStore(args.store) as store:
+            try:
+                store.refresh("suntrex", CATALOG_FILE)
+                store.set_families("suntrex", groups.sku_to_family, step="scrape")
+                stored = store.update("suntrex", {sku: {"image": entry['src']} for sku, entry in image_map.items()},
+                                      step="scrape")
+                exported = store.export("suntrex")
+                print(f"🗃️  Catalog store: {stored} image links updated ({args.store})"
+                      + (f", {CATALOG_FILE.name} exported" if exported else ""))
+            except (UnexportedChanges, SourceChanged) as e:
+                unexported = store.stats("suntrex")["pending"]
+                print(f"⚠️  Catalog store: {e} — {unexported} updates not exported ({args.store})")
+    
+    IMAGE_CACHE.save()
+    FAILURES.save()
+    evicted = IMAGE_CACHE.evict()
+    if evicted:
+        IMAGE_CACHE.save()
     
     # Summary
     print(f"\n{'=' * 60}")
     print(f"🎉 DONE!")
-    print(f"  📸 Downloaded: {downloaded} family images")
-    print(f"  📎 Placeholders: {placeholders}")
+    print(f"  📸 Downloaded: {downloaded} family images ({regenerated} regenerated from cache)")
+    print(f"  📎 Placeholders: {placeholders} ({skipped} families skipped, failed recently), "
+          f"{len(written_placeholders)} SVG files ({args.placeholders})")
     print(f"  ❌ Failed: {failed}")
     print(f"  📄 Image map: {IMAGE_MAP_FILE}")
+    net = HTTP.stats.summary()
+    print(f"  🌐 HTTP: {net['requests']} requests, {net['retries']} retries, {net['errors']} errors, "
+          f"latency p50 {net['latency_ms_p50']} ms / p95 {net['latency_ms_p95']} ms")
+    print(f"  🗄️  Image cache: {IMAGE_CACHE_DIR} ({evicted} evicted)")
     print(f"\n  Total SKUs mapped: {len(image_map)}/{len(catalog)}")
     
-    # Generate report of what needs manual work
-    report_path = OUTPUT_DIR / "MANUAL-IMAGES-NEEDED.md"
-    with open(report_path, 'w') as f:
-        f.write("# Images à télécharger manuellement\n\n")
-        f.write("Ces familles de produits n'ont pas pu être scrapées automatiquement.\n")
-        f.write("Téléchargez les images depuis les sites fabricants et placez-les dans le bon dossier.\n\n")
-        
-        for family_id, family in MODEL_FAMILIES.items():
-            if family_id in family_images and '.svg' in family_images[family_id]:
-                family_skus = [sku for sku, fid in sku_to_family.items() if fid == family_id]
-                brand = next((p['brand'] for p in catalog if p['sku'] == family_skus[0]), '?')
-                f.write(f"## {brand} — {family_id}\n")
-                f.write(f"- Recherche Google: `{family.get('search', 'N/A')}`\n")
-                f.write(f"- SKUs concernés: {', '.join(family_skus[:5])}\n")
-                f.write(f"- Destination: `public/products/{slugify(brand)}/{family_id}.webp`\n\n")
-    
-    print(f"  📋 Manual report: {report_path}")
+    write_manual_report(REPORT_FILE, {fid for fid, ok in outcomes.items() if not ok}, groups, families)
+    journal.finish()
+    print(f"  📋 Manual report: {REPORT_FILE}")
 
 
 if __name__ == "__main__":
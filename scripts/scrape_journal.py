@@ -0,0 +1,92 @@
+"""Checkpoint journal for scrape-product-images.py.
+
+Each family outcome is appended to an NDJSON journal as soon as it is known,
+so an interrupted run (Ctrl-C, crash, network outage) loses nothing: the
+next run with the same render settings resumes from it and only processes
+the families that have no outcome yet. finish() drops the journal once the
+final image map is written.
+
+Journal ops (one JSON object per line):
+  {"op": "begin", "settings": <render key>, "at": ...}
+  {"op": "family", "family_id": ..., "ok": true, "sha256": ..., "manifest": {...}}
+  {"op": "family", "family_id": ..., "ok": false}
+"""
+
+import datetime
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+
+class ScrapeJournal:
+    def __init__(self, path, interval=10.0):
+        self.path = Path(path)
+        self.interval = interval
+        self.lock = threading.Lock()
+        self._file = None
+        self._last_checkpoint = time.monotonic()
+
+    def resume(self, settings):
+        """Outcomes {family_id: entry} of an unfinished run with the same settings.
+
+        A journal written with other render settings is discarded. A torn
+        last line (crash mid-write) is ignored.
+        """
+        outcomes = {}
+        if not self.path.exists():
+            return outcomes
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if entry["op"] == "begin" and entry.get("settings") != settings:
+                    outcomes = None
+                    break
+                if entry["op"] == "family":
+                    outcomes[entry["family_id"]] = entry
+        if outcomes is None:
+            self.path.unlink()
+            return {}
+        return outcomes
+
+    def begin(self, settings):
+        """Start a run, or continue appending to the journal being resumed."""
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            self._append({"op": "begin", "settings": settings, "at": datetime.datetime.now().isoformat()})
+
+    def _append(self, entry):
+        with self.lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def record(self, family_id, ok, sha=None, manifest=None):
+        """Append one family outcome; True when a checkpoint is due."""
+        entry = {"op": "family", "family_id": family_id, "ok": ok}
+        if ok and sha:
+            entry.update(sha256=sha, manifest=manifest or {})
+        self._append(entry)
+        with self.lock:
+            if time.monotonic() - self._last_checkpoint >= self.interval:
+                self._last_checkpoint = time.monotonic()
+                return True
+        return False
+
+    def sync(self):
+        with self.lock:
+            if self._file is not None:
+                os.fsync(self._file.fileno())
+
+    def finish(self):
+        """The run completed and its outputs are written: drop the journal."""
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,244 @@
+"""
+Network layer for scrape-product-images.py.
+
+- HostRateLimiter: one token bucket per host, so politeness is enforced per
+  site instead of with a global sleep after every request.
+- HttpClient: pooled keep-alive sessions with retries (exponential backoff,
+  full jitter, Retry-After) and per-request latency / retry stats.
+- iter_capped(): streamed response body with a hard size limit.
+- run_concurrently(): bounded thread pool yielding results as they finish.
+
+Everything here is plain stdlib + requests, and only talks to the URLs it is
+given, so it can be exercised against a local HTTP stand-in server
+(e.g. ``python3 -m http.server``).
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens/s, at most ``burst`` banked."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """Per-host token buckets, created on first use.
+
+    ``overrides`` maps a hostname to its own (rate, burst), e.g. to be
+    gentler with a search engine than with a CDN.
+    """
+
+    def __init__(self, rate, burst=1, overrides=None):
+        self.rate = rate
+        self.burst = burst
+        self.overrides = overrides or {}
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url):
+        host = urlsplit(url).hostname or ""
+        with self.lock:
+            if host not in self.buckets:
+                rate, burst = self.overrides.get(host, (self.rate, self.burst))
+                self.buckets[host] = TokenBucket(rate, burst)
+            return self.buckets[host]
+
+    def wait(self, url):
+        """Block until a request to url's host is allowed."""
+        if self.rate > 0:
+            self.bucket(url).acquire()
+
+
+class RequestStats:
+    """Thread-safe counters for HttpClient: latency, retries, outcomes."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.retries = 0
+        self.errors = 0
+        self.statuses = {}
+
+    def record(self, latency, status=None, retries=0):
+        with self.lock:
+            self.latencies.append(latency)
+            self.retries += retries
+            if status is None:
+                self.errors += 1
+            else:
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def summary(self):
+        with self.lock:
+            lat = sorted(self.latencies)
+
+        def pick(q):
+            return round(lat[min(len(lat) - 1, int(q * len(lat)))] * 1000) if lat else None
+
+        return {
+            "requests": len(lat),
+            "retries": self.retries,
+            "errors": self.errors,
+            "statuses": dict(sorted(self.statuses.items())),
+            "latency_ms_p50": pick(0.50),
+            "latency_ms_p95": pick(0.95),
+        }
+
+
+def retry_after_seconds(value):
+    """Parse a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpClient:
+    """GET with connection pooling, politeness and retries.
+
+    All threads share one HTTPAdapter (urllib3 pool, keep-alive); each thread
+    gets its own Session mounted on it. Connection errors, timeouts and
+    429/5xx answers are retried up to ``retries`` times with exponential
+    backoff and full jitter, or after the server's Retry-After when given.
+    """
+
+    def __init__(self, headers=None, limiter=None, pool_size=10, retries=3,
+                 backoff=0.5, max_backoff=30.0):
+        self.headers = headers or {}
+        self.limiter = limiter
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.local = threading.local()
+        self.stats = RequestStats()
+
+    def session(self):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            session.mount("http://", self.adapter)
+            session.mount("https://", self.adapter)
+            self.local.session = session
+        return session
+
+    def _delay(self, attempt, resp=None):
+        hint = retry_after_seconds(resp.headers.get("Retry-After")) if resp is not None else None
+        if hint is not None:
+            return min(hint, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def get(self, url, **kwargs):
+        """requests.get() equivalent; raises the last error once retries run out."""
+        retries = 0
+        while True:
+            if self.limiter:
+                self.limiter.wait(url)
+            start = time.perf_counter()
+            try:
+                resp = self.session().get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if retries >= self.retries:
+                    self.stats.record(time.perf_counter() - start, None, retries)
+                    raise
+                time.sleep(self._delay(retries))
+                retries += 1
+                continue
+
+            if resp.status_code in RETRY_STATUSES and retries < self.retries:
+                delay = self._delay(retries, resp)
+                resp.close()
+                time.sleep(delay)
+                retries += 1
+                continue
+
+            self.stats.record(time.perf_counter() - start, resp.status_code, retries)
+            return resp
+
+
+class ResponseTooLarge(ValueError):
+    """The body is (or announces to be) larger than the allowed size."""
+
+
+def iter_capped(resp, max_bytes, chunk_size=64 * 1024):
+    """Yield the body of a stream=True response, at most max_bytes of it.
+
+    A Content-Length above the cap is refused before reading anything;
+    otherwise ResponseTooLarge is raised as soon as the cap is crossed.
+    """
+    length = resp.headers.get("Content-Length")
+    if length and length.isdigit() and int(length) > max_bytes:
+        resp.close()
+        raise ResponseTooLarge(f"{int(length)} bytes announced, limit {max_bytes}")
+    total = 0
+    for chunk in resp.iter_content(chunk_size):
+        total += len(chunk)
+        if total > max_bytes:
+            resp.close()
+            raise ResponseTooLarge(f"more than {max_bytes} bytes")
+        yield chunk
+
+
+def is_permanent_failure(exc):
+    """True when retrying later is pointless: a 4xx answer or bad content.
+
+    Network errors, timeouts, 429 and 5xx are transient and return False.
+    """
+    if isinstance(exc, requests.RequestException):
+        resp = exc.response
+        return resp is not None and resp.status_code < 500 and resp.status_code not in RETRY_STATUSES
+    return True
+
+
+def run_concurrently(fn, items, workers=8):
+    """Yield (item, fn(item)) as each call finishes, at most ``workers`` at a time."""
+    if workers <= 1:
+        for item in items:
+            yield item, fn(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fn, item): item for item in items}
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        except BaseException:
+            # Ctrl-C or the caller stopped iterating: do not start the rest
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
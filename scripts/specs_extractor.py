@@ -0,0 +1,806 @@
+"""Datasheet spec extraction library (PDF → JSON), used by extract-specs.py.
+
+Importing this module has no side effects and does not load PyMuPDF; it is
+imported on first PDF access, so a long-running worker can keep the module
+loaded and call extract_file()/extract_corpus() per request:
+
+    from specs_extractor import extract_file, extract_corpus
+
+    record = extract_file("public/datasheets/deye/bos-gm51-datasheet.pdf")
+    for res in extract_corpus(paths, jobs=4, cache=SpecCache()):
+        ...
+"""
+
+import gzip
+import hashlib
+import inspect
+import json
+import re
+import os
+import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from atomic_file import AtomicFile, write_atomic
+
+DATASHEETS_DIR = "public/datasheets"
+SPECS_DIR = "public/specs"
+CACHE_DIR = ".cache/extract-specs"
+CACHE_MAX_MB = 256
+
+# ── Patterns regex universels pour specs PV ──────────────────────────
+PATTERNS = {
+    # Puissance
+    "power_kw_rated": r'(?:rated|max|nominal|ac)\s*(?:output\s*)?power[^\d]*(\d{1,3}(?:\.\d)?)\s*kW',
+    "power_w":        r'(\d{1,5})\s*(?:W|Watt|Wc|Wp)(?:\s|$|,|\.)',
+    "power_kw":       r'(\d{1,3}(?:\.\d)?)\s*kW(?:\s|$|,|\.)',
+    # Rendement
+    "efficiency_pct": r'(?:efficiency|rendement|wirkungsgrad|max\.?\s*efficiency)[^\d]*(\d{2}(?:\.\d{1,2})?)\s*%',
+    # Phases
+    "phases":         r'(?:single.phase|monophas|einphasig|1.phase)',
+    "phases_3":       r'(?:three.phase|triphas|dreiphasig|3.phase)',
+    # MPPT
+    "mppt_count":     r'(\d)\s*(?:MPPT|mppt)',
+    "mppt_voltage":   r'(?:MPPT|mppt)[^\d]*(\d{2,4})\s*V',
+    # Dimensions
+    "dimensions":     r'(\d{3,4})\s*[×xX\*]\s*(\d{2,4})\s*[×xX\*]\s*(\d{2,4})\s*(?:mm)?',
+    # Poids
+    "weight_kg":      r'(\d{1,3}(?:\.\d)?)\s*kg',
+    # IP Rating
+    "ip_rating":      r'IP\s*(\d{2})',
+    # Température
+    "temp_range":     r'(-\d{1,2})\s*°?C?\s*(?:to|à|bis|~|\.\.\.)\s*\+?(\d{2,3})\s*°?C',
+    # Garantie
+    "warranty":       r'(\d{1,2})\s*(?:year|ans|jahre|yr)(?:s)?\s*(?:warranty|garantie)',
+    # Capacité batterie
+    "capacity_kwh":   r'(\d{1,3}(?:\.\d{1,2})?)\s*kWh',
+    "capacity_ah":    r'(\d{2,4})\s*Ah',
+    # Tension
+    "voltage_v":      r'(\d{2,4})\s*V(?:DC|AC)?',
+    # Certifications
+    "certifications": r'(CE|IEC\s*\d+|UL\s*\d+|VDE|G98|G99|RD1699|EN\s*\d+)',
+}
+
+
+# Patterns matched case-insensitively. They run without re.IGNORECASE on a
+# lowercased copy of the text, which is several times cheaper for `re`.
+ICASE_PATTERNS = {
+    "power_kw_rated", "power_kw", "efficiency_pct", "phases", "phases_3",
+    "mppt_count", "warranty", "capacity_kwh",
+}
+
+# Where matches can start. A match of a key only ever starts where the
+# trigger regex of its text (the lowercased copy for ICASE_PATTERNS keys)
+# matches with its capture set to one of the texts listed for the key in
+# TRIGGER_KEYS. Each branch has exactly one group, and where one branch
+# matches, no key of another branch can, so the captured text names the only
+# keys worth trying at that position.
+TRIGGERS = {
+    "text":  r"\d[\d.]*\s*([WkAV×xX*])|(-)\d|(IP|MPPT|mppt|CE|IEC|UL|VDE|G98|G99|RD1699|EN)",
+    "lower": r"\d[\d.]*\s*([kmyaj])|([13]).phase"
+             r"|(rated|nominal|ac|max|efficiency|rendement|wirkungsgrad"
+             r"|single|monophas|einphasig|three|triphas|dreiphasig)",
+}
+TRIGGER_KEYS = {
+    "text": {
+        "W": ("power_w",), "k": ("weight_kg",), "A": ("capacity_ah",), "V": ("voltage_v",),
+        **dict.fromkeys("×xX*", ("dimensions",)),
+        "-": ("temp_range",), "IP": ("ip_rating",), "MPPT": ("mppt_voltage",), "mppt": ("mppt_voltage",),
+        **dict.fromkeys(("CE", "IEC", "UL", "VDE", "G98", "G99", "RD1699", "EN"), ("certifications",)),
+    },
+    "lower": {
+        "k": ("power_kw", "capacity_kwh"), "m": ("mppt_count",), **dict.fromkeys("yaj", ("warranty",)),
+        "1": ("phases",), "3": ("phases_3",),
+        "rated": ("power_kw_rated",), "nominal": ("power_kw_rated",), "ac": ("power_kw_rated",),
+        "max": ("power_kw_rated", "efficiency_pct"),
+        **dict.fromkeys(("efficiency", "rendement", "wirkungsgrad"), ("efficiency_pct",)),
+        **dict.fromkeys(("single", "monophas", "einphasig"), ("phases",)),
+        **dict.fromkeys(("three", "triphas", "dreiphasig"), ("phases_3",)),
+    },
+}
+
+
+def _fold_pattern(pattern):
+    """Lowercase a pattern's literals, leaving escapes such as \\d intact."""
+    def fold(m):
+        token = m.group(0)
+        return token if token.startswith("\\") else token.lower()
+    return re.sub(r'\\.|[^\\]+', fold, pattern)
+
+
+class SpecScanner:
+    """Finds the matches of PATTERNS keys in at most two passes over a text.
+
+    One trigger regex per text (the original, and the lowercased copy for
+    ICASE_PATTERNS keys) is scanned once, whatever the number of keys. At
+    each trigger hit, only the keys its captured text names are matched in
+    place, with their own pattern. Every start of a match is a hit, so the first
+    match of a key is the one re.search() finds, and the matches starting
+    past the end of the previous one are re.findall()'s.
+    """
+
+    COMPILED = {
+        key: re.compile(_fold_pattern(pat) if key in ICASE_PATTERNS else pat)
+        for key, pat in PATTERNS.items()
+    }
+    TRIGGERS = {target: re.compile(trigger) for target, trigger in TRIGGERS.items()}
+
+    def __init__(self):
+        self.passes = 0
+
+    def scan(self, text, first=(), every=()):
+        """({key: groups} of the first match of each key in ``first``,
+        {key: [groups, ...]} of the non-overlapping matches of each key in ``every``).
+        """
+        found = {}
+        matches = {key: [] for key in every}
+        for target, trigger in self.TRIGGERS.items():
+            keys_at = TRIGGER_KEYS[target]
+            is_lower = target == "lower"
+            wanted = {key for key in first if (key in ICASE_PATTERNS) == is_lower}
+            ends = {key: 0 for key in every if (key in ICASE_PATTERNS) == is_lower}
+            if not (wanted or ends):
+                continue
+            self.passes += 1
+            haystack = text.lower() if is_lower else text
+            pos = 0
+            while wanted or ends:
+                hit = trigger.search(haystack, pos)
+                if hit is None:
+                    break
+                pos = hit.start()
+                for key in keys_at[hit.group(hit.lastindex)]:
+                    if key in wanted:
+                        m = self.COMPILED[key].match(haystack, pos)
+                        if m:
+                            found[key] = m.groups()
+                            wanted.discard(key)
+                    elif key in ends and pos >= ends[key]:
+                        m = self.COMPILED[key].match(haystack, pos)
+                        if m:
+                            matches[key].append(m.groups())
+                            ends[key] = m.end()
+                pos += 1
+        return found, matches
+
+
+class ExtractionError(Exception):
+    """A datasheet could not be turned into a spec record."""
+
+
+def _fitz():
+    import fitz  # pymupdf — heavy, only loaded once a PDF is opened
+    return fitz
+
+
+class PdfPages:
+    """Lazy per-page text access to one PDF; use as a context manager."""
+
+    def __init__(self, pdf_path):
+        self.doc = _fitz().open(pdf_path)
+        self.page_count = self.doc.page_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.doc.close()
+
+    def page(self, i):
+        return self.doc[i].get_text()
+
+    def iter(self, start=0):
+        """Yield page texts from ``start`` on, one page in memory at a time."""
+        for i in range(start, self.page_count):
+            yield self.page(i)
+
+
+def extract_text(pdf_path):
+    """Extract all text from a PDF file."""
+    with PdfPages(pdf_path) as pdf:
+        return "".join(page + "\n" for page in pdf.iter())
+
+
+class SpecParser:
+    """Incremental parse_specs(): feed the document chunk by chunk (e.g. per page).
+
+    Only the parsed fields, the first HEAD_CHARS characters (for
+    infer_category) and a short tail of the previous chunk (for matches that
+    straddle a page break) are kept, so memory does not grow with the PDF.
+    Fed with the whole text at once it gives exactly parse_specs()'s result.
+    """
+
+    HEAD_CHARS = 2000
+    TAIL_CHARS = 256
+
+    # First match wins; a key is no longer searched once it, or a key that
+    # takes precedence over it, has matched.
+    FIRST_MATCH = (
+        "power_kw_rated", "power_kw", "power_w", "efficiency_pct", "phases_3",
+        "phases", "mppt_count", "dimensions", "ip_rating", "temp_range",
+        "warranty", "capacity_kwh", "capacity_ah",
+    )
+    OVERRIDDEN_BY = {
+        "power_kw": ("power_kw_rated",),
+        "power_w": ("power_kw_rated", "power_kw"),
+        "phases": ("phases_3",),
+        "capacity_ah": ("capacity_kwh",),
+    }
+    # Every match is needed (smallest plausible weight, all certifications)
+    ALL_MATCHES = ("weight_kg", "certifications")
+    SCANNER = SpecScanner()
+
+    def __init__(self):
+        self.found = {}
+        self.min_weight = None
+        self.certs = set()
+        self.head = ""
+        self.tail = ""
+        self.size = 0
+        self.content_chars = 0
+
+    def feed(self, chunk):
+        if len(self.head) < self.HEAD_CHARS:
+            self.head += chunk[:self.HEAD_CHARS - len(self.head)]
+        self.size += len(chunk)
+        self.content_chars += len(chunk.strip())
+
+        wanted = [key for key in self.FIRST_MATCH
+                  if key not in self.found and not any(k in self.found for k in self.OVERRIDDEN_BY.get(key, ()))]
+        first, every = self.SCANNER.scan(self.tail + chunk, wanted, self.ALL_MATCHES)
+        # Same precedence as searching the keys one by one in FIRST_MATCH order
+        for key in wanted:
+            if key in first and not any(k in self.found for k in self.OVERRIDDEN_BY.get(key, ())):
+                self.found[key] = first[key]
+
+        # Poids – prend le plus petit poids plausible
+        for (w,) in every["weight_kg"]:
+            w = float(w)
+            if 1 < w < 500 and (self.min_weight is None or w < self.min_weight):
+                self.min_weight = w
+
+        self.certs.update(cert for (cert,) in every["certifications"])
+
+        # Keep the end of this chunk, cut on whitespace so no number is split
+        tail = (self.tail + chunk)[-self.TAIL_CHARS:]
+        cut = re.search(r"\s", tail)
+        self.tail = tail[cut.start():] if cut else ""
+
+    def specs(self):
+        found = self.found
+        specs = {}
+
+        # Puissance kW — try specific patterns first
+        kw = found.get("power_kw_rated") or found.get("power_kw")
+        if kw:
+            specs["power_kw"] = float(kw[0])
+
+        # Puissance W (fallback)
+        if "power_kw" not in specs and "power_w" in found:
+            val = int(found["power_w"][0])
+            if val > 100:  # Ignore small values
+                specs["power_w"] = val
+                specs["power_kw"] = round(val / 1000, 2)
+
+        # Rendement
+        if "efficiency_pct" in found:
+            val = float(found["efficiency_pct"][0])
+            if 80 <= val <= 100:
+                specs["efficiency_pct"] = val
+
+        # Phases
+        if "phases_3" in found:
+            specs["phases"] = 3
+        elif "phases" in found:
+            specs["phases"] = 1
+
+        # MPPT
+        if "mppt_count" in found:
+            specs["mppt_count"] = int(found["mppt_count"][0])
+
+        # Dimensions
+        if "dimensions" in found:
+            specs["dimensions_mm"] = "x".join(found["dimensions"])
+
+        if self.min_weight is not None:
+            specs["weight_kg"] = self.min_weight
+
+        # IP Rating
+        if "ip_rating" in found:
+            specs["ip_rating"] = f"IP{found['ip_rating'][0]}"
+
+        # Température de fonctionnement
+        if "temp_range" in found:
+            low, high = found["temp_range"]
+            specs["operating_temp"] = f"{low}°C to +{high}°C"
+
+        # Garantie
+        if "warranty" in found:
+            specs["warranty_years"] = int(found["warranty"][0])
+
+        # Capacité (batteries)
+        if "capacity_kwh" in found:
+            specs["capacity_kwh"] = float(found["capacity_kwh"][0])
+        elif "capacity_ah" in found:
+            specs["capacity_ah"] = int(found["capacity_ah"][0])
+
+        # Certifications
+        if self.certs:
+            specs["certifications"] = sorted(self.certs)
+
+        return specs
+
+    def has_fields(self, required):
+        """True when every group in ``required`` has at least one field filled."""
+        specs = self.specs()
+        return all(any(field in specs for field in group) for group in required)
+
+
+# --early-stop: stop reading pages once each group has one field filled
+REQUIRED_FIELDS = (
+    ("power_kw", "capacity_kwh", "capacity_ah"),
+    ("dimensions_mm",),
+    ("weight_kg",),
+    ("ip_rating",),
+    ("operating_temp",),
+)
+
+
+def parse_specs(text, filename):
+    """Parse technical specs from extracted text using regex patterns."""
+    parser = SpecParser()
+    parser.feed(text)
+    return parser.specs()
+
+
+def infer_category(filename, text_snippet, specs):
+    """Infer product category from filename, text content, and specs."""
+    fn = filename.lower()
+    txt = text_snippet.lower()[:2000] if text_snippet else ""
+    if any(x in fn for x in ["battery", "batt", "luna", "bos", "storage", "lfe"]):
+        return "battery"
+    if any(x in fn for x in ["panel", "module", "solar-panel", "jam", "flash", "ds-flash"]):
+        return "panel"
+    if any(x in fn for x in ["hms", "hmt", "iq8", "micro"]):
+        return "microinverter"
+    if any(x in fn for x in ["optimizer", "p1300", "merc", "optimiseur"]):
+        return "optimizer"
+    if any(x in fn for x in ["envoy", "dtu", "dongle", "gateway", "smartlogger"]):
+        return "monitoring"
+    if any(x in fn for x in ["guard", "smartps"]):
+        return "accessory"
+    if any(x in fn for x in ["scharger"]):
+        return "ev-charger"
+    if any(x in fn for x in ["sun2000", "sun-", "hybrid", "inverter", "onduleur", "ktl", "sg0"]):
+        return "inverter"
+    # Fallback: check text content
+    if "hybrid inverter" in txt or "wechselrichter" in txt or "onduleur" in txt:
+        return "inverter"
+    if "battery" in txt or "batterie" in txt:
+        return "battery"
+    return "accessory"
+
+
+def slug_to_info(filepath):
+    """Extract brand and model from filepath."""
+    parts = Path(filepath).parts
+    brand = parts[-2] if len(parts) >= 2 else "unknown"
+    stem = Path(filepath).stem.replace("-datasheet", "").replace("-specs", "")
+    return brand.upper(), stem.upper().replace("-", " ")
+
+
+# ── Cache incrémental ────────────────────────────────────────────────
+def parser_fingerprint():
+    """Version of the parsing stage.
+
+    Hashes the tables (PATTERNS, ICASE_PATTERNS, TRIGGERS, TRIGGER_KEYS,
+    REQUIRED_FIELDS) and the source of _fold_pattern, SpecScanner,
+    SpecParser, parse_specs and infer_category. Any regex or parser edit
+    changes the fingerprint, which invalidates the parsed-specs cache level
+    while keeping the extracted-text level.
+    """
+    h = hashlib.sha256()
+    tables = [PATTERNS, sorted(ICASE_PATTERNS), TRIGGERS, TRIGGER_KEYS, REQUIRED_FIELDS]
+    h.update(json.dumps(tables, sort_keys=True).encode("utf-8"))
+    for fn in (_fold_pattern, SpecScanner, SpecParser, parse_specs, infer_category):
+        h.update(inspect.getsource(fn).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+class SpecCache:
+    """Two-level on-disk cache keyed by PDF content hash.
+
+    - ``text/<sha256>.pages.ndjson.gz``: raw text of the pages read so far,
+      one JSON string per line after a ``{"page_count": n}`` header line;
+      written and read one page at a time (PageSpool / CachedPages)
+    - ``specs/<sha256>-<parser>.json``: parse_specs()/infer_category() output
+
+    ``manifest.json`` maps each PDF path to its size/mtime/sha256, so an
+    unchanged file costs a single stat. Entries are touched on hit and the
+    least recently used ones are evicted once the cache exceeds ``max_bytes``.
+    The manifest stays in the parent: workers get a manifest-less instance
+    (see _init_worker) and only read and write entries by sha.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=CACHE_MAX_MB * 1024 * 1024, rebuild=False):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.rebuild = rebuild
+        self.manifest = None
+
+    # Manifest (parent process only)
+    def _manifest_path(self):
+        return self.root / "manifest.json"
+
+    def load_manifest(self):
+        self.manifest = {}
+        if not self.rebuild and self._manifest_path().exists():
+            try:
+                with open(self._manifest_path(), encoding="utf-8") as f:
+                    self.manifest = json.load(f)
+            except (OSError, ValueError):
+                self.manifest = {}
+        return self.manifest
+
+    def save_manifest(self):
+        if self.manifest is not None:
+            write_atomic(self._manifest_path(), json.dumps(self.manifest, indent=1).encode("utf-8"))
+
+    def file_hash(self, pdf_path):
+        """sha256 of the PDF, reusing the manifest entry when size/mtime match."""
+        if self.manifest is None:
+            self.load_manifest()
+        st = os.stat(pdf_path)
+        entry = self.manifest.get(str(pdf_path))
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry["sha256"]
+        h = hashlib.sha256()
+        with open(pdf_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        sha = h.hexdigest()
+        self.manifest[str(pdf_path)] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha}
+        return sha
+
+    # Entries (safe from workers: one file per key, atomic writes)
+    def _hit(self, path):
+        if self.rebuild or not path.exists():
+            return False
+        try:
+            os.utime(path)
+        except OSError:
+            return False
+        return True
+
+    def _pages_path(self, sha):
+        return self.root / "text" / f"{sha}.pages.ndjson.gz"
+
+    def get_pages(self, sha):
+        """CachedPages for the PDF's text entry, or None."""
+        path = self._pages_path(sha)
+        if not self._hit(path):
+            return None
+        try:
+            return CachedPages(path)
+        except (OSError, EOFError, ValueError, KeyError):
+            return None
+
+    def page_spool(self, sha, page_count):
+        """PageSpool replacing the PDF's text entry once committed."""
+        return PageSpool(self._pages_path(sha), page_count)
+
+    def get_specs(self, sha, parser):
+        path = self.root / "specs" / f"{sha}-{parser}.json"
+        if not self._hit(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def put_specs(self, sha, parser, parsed):
+        write_atomic(self.root / "specs" / f"{sha}-{parser}.json",
+                      json.dumps(parsed, ensure_ascii=False).encode("utf-8"))
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for sub in ("text", "specs"):
+            d = self.root / sub
+            if d.is_dir():
+                for path in d.iterdir():
+                    st = path.stat()
+                    entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+
+class CachedPages:
+    """A text cache entry; pages are decoded lazily, one at a time."""
+
+    def __init__(self, path):
+        self.path = path
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            self.page_count = json.loads(f.readline())["page_count"]
+
+    def iter(self, limit=None):
+        """Yield the stored page texts (the first ``limit`` only, if given)."""
+        if limit == 0:
+            return
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            f.readline()
+            for i, line in enumerate(f, 1):
+                yield json.loads(line)
+                if limit and i >= limit:
+                    return
+
+
+class PageSpool:
+    """Writer of a text cache entry: pages are compressed as they are added."""
+
+    def __init__(self, path, page_count):
+        self.out = AtomicFile(path, "wb")
+        self.gz = gzip.GzipFile(fileobj=self.out.file, mode="wb", compresslevel=1)
+        self.gz.write((json.dumps({"page_count": page_count}) + "\n").encode("utf-8"))
+
+    def write(self, text):
+        self.gz.write((json.dumps(text, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    def commit(self):
+        self.gz.close()
+        self.out.commit()
+
+    def discard(self):
+        self.gz.close()
+        self.out.discard()
+
+
+class DocumentPages:
+    """Page texts of one PDF, one in memory at a time: text-cache pages first,
+    then the PDF (only opened if more pages are needed).
+
+    With a cache, pages read from the PDF are spooled to a new text entry
+    (after a copy of the cached ones), which replaces the old entry when the
+    ``with`` block exits normally. ``read`` counts the pages yielded.
+    """
+
+    def __init__(self, pdf_path, cached=None, cache=None, sha=None):
+        self.pdf_path = pdf_path
+        self.cached = cached
+        self.cache = cache
+        self.sha = sha
+        self.page_count = cached.page_count if cached else None
+        self.read = 0
+        self._pdf = None
+        self._spool = None
+        self._pages = None
+
+    def __enter__(self):
+        return self
+
+    def __iter__(self):
+        self._pages = self._iter()
+        return self._pages
+
+    def _iter(self):
+        if self.cached:
+            for text in self.cached.iter():
+                self.read += 1
+                yield text
+            if self.read >= self.page_count:
+                return
+        self._pdf = PdfPages(self.pdf_path)
+        self.page_count = self._pdf.page_count
+        for i in range(self.read, self.page_count):
+            text = self._pdf.page(i)
+            if self.cache:
+                if self._spool is None:
+                    self._spool = self.cache.page_spool(self.sha, self.page_count)
+                    for cached_text in (self.cached.iter(limit=i) if self.cached else ()):
+                        self._spool.write(cached_text)
+                self._spool.write(text)
+            self.read += 1
+            yield text
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._pages is not None:
+            self._pages.close()
+        if self._pdf is not None:
+            self._pdf.close()
+        if self._spool is not None:
+            if exc_type is None:
+                self._spool.commit()
+            else:
+                self._spool.discard()
+        return False
+
+
+def sku_for(pdf_path):
+    """SKU depuis le nom de fichier."""
+    return Path(pdf_path).stem.replace("-datasheet", "").replace("-specs", "").upper()
+
+
+def datasheet_url(pdf_path):
+    """Public URL of a datasheet, also the key of its record in index.json."""
+    return f"/datasheets/{'/'.join(Path(pdf_path).parts[-2:])}"
+
+
+def build_output(pdf_path, parsed):
+    """Assemble the per-product record from path-derived fields and parsed specs."""
+    brand, model = slug_to_info(str(pdf_path))
+
+    # Chemin image correspondant
+    img_slug = pdf_path.stem.replace("-datasheet", "").replace("-specs", "")
+    img_path = f"/products/{brand.lower()}/{img_slug}.jpg"
+
+    return {
+        "sku": sku_for(pdf_path),
+        "brand": brand,
+        "model": model,
+        "category": parsed["category"],
+        "specs": parsed["specs"],
+        "datasheet_url": datasheet_url(pdf_path),
+        "image_url": img_path,
+        "extracted_at": parsed["extracted_at"],
+    }
+
+
+def read_full(pdf_path, cached=None, cache=None, sha=None):
+    """Parse the whole document as one text (exactly parse_specs() semantics)."""
+    with DocumentPages(pdf_path, cached, cache, sha) as doc:
+        text = "".join(page + "\n" for page in doc)
+    state = SpecParser()
+    state.feed(text)
+    return state, doc.read, doc.page_count
+
+
+def read_streaming(pdf_path, cached=None, cache=None, sha=None, max_pages=0, early_stop=False):
+    """Feed the parser page by page, stopping at the page budget or once
+    REQUIRED_FIELDS are filled (early_stop). Pages already in the text cache
+    are reused; the PDF is only opened if more pages are needed. Neither the
+    parser nor the cache keeps the pages, so memory does not grow with the PDF.
+    """
+    state = SpecParser()
+    with DocumentPages(pdf_path, cached, cache, sha) as doc:
+        for text in doc:
+            state.feed(text + "\n")
+            if max_pages and doc.read >= max_pages:
+                break
+            if early_stop and state.has_fields(REQUIRED_FIELDS):
+                break
+    return state, doc.read, doc.page_count
+
+
+def process_pdf(pdf_path, sha=None, cache=None, parser=None, max_pages=0, early_stop=False):
+    """Extract one datasheet. Runs in a worker process when --jobs > 1.
+
+    With a cache, the extracted text is reused when the PDF content is
+    unchanged, so a parser change never re-opens the PDF. With a page
+    budget or early_stop, pages are streamed and memory stays bounded.
+
+    Returns a dict with either an ``output`` record or an ``error`` message,
+    plus the log lines to print in the parent.
+    """
+    pdf_path = Path(pdf_path)
+    log = [f"  → {pdf_path.name}"]
+    try:
+        cached = cache.get_pages(sha) if cache else None
+        if cached:
+            log[0] += " (texte en cache)"
+
+        if max_pages or early_stop:
+            state, read, total = read_streaming(pdf_path, cached, cache, sha, max_pages, early_stop)
+        else:
+            state, read, total = read_full(pdf_path, cached, cache, sha)
+
+        if state.content_chars < 50:
+            log.append(f"     ⚠️  Texte trop court ({state.size} chars), PDF scanné ?")
+            return {"file": str(pdf_path), "error": "Text too short (scanned PDF?)", "log": log}
+
+        specs = state.specs()
+        parsed = {
+            "specs": specs,
+            "category": infer_category(pdf_path.name, state.head, specs),
+            "extracted_at": datetime.datetime.now().isoformat(),
+            "pages_read": read,
+            "page_count": total,
+        }
+        if cache:
+            cache.put_specs(sha, parser, parsed)
+        return {"file": str(pdf_path), "output": build_output(pdf_path, parsed),
+                "pages": (read, total), "log": log}
+
+    except Exception as e:
+        log.append(f"     ❌ Erreur : {e}")
+        return {"file": str(pdf_path), "error": str(e), "log": log}
+
+
+_WORKER_CACHE = None
+
+
+def _init_worker(cache_root, rebuild):
+    """Pool initializer: one manifest-less SpecCache per worker process."""
+    global _WORKER_CACHE
+    _WORKER_CACHE = SpecCache(cache_root, rebuild=rebuild) if cache_root else None
+
+
+def _process_in_worker(pdf_path, sha, parser, max_pages, early_stop):
+    return process_pdf(pdf_path, sha, _WORKER_CACHE, parser, max_pages, early_stop)
+
+
+def extract_corpus(pdf_files, jobs=1, cache=None, max_pages=0, early_stop=False):
+    """Yield process_pdf() results, as they finish when jobs > 1.
+
+    Files whose parsed specs are cached for the current parser and read
+    mode are answered from the cache in the parent and never reach the pool.
+    """
+    parser = None
+    if cache:
+        parser = parser_fingerprint()
+        if max_pages or early_stop:
+            parser += f"-p{max_pages}{'e' if early_stop else ''}"
+    pending = []
+    for pdf_path in pdf_files:
+        sha = None
+        if cache:
+            sha = cache.file_hash(pdf_path)
+            parsed = cache.get_specs(sha, parser)
+            if parsed is not None:
+                yield {
+                    "file": str(pdf_path),
+                    "output": build_output(Path(pdf_path), parsed),
+                    "pages": (parsed.get("pages_read"), parsed.get("page_count")),
+                    "log": [f"  → {Path(pdf_path).name} (en cache)"],
+                }
+                continue
+        pending.append((pdf_path, sha))
+
+    if jobs <= 1:
+        for pdf_path, sha in pending:
+            yield process_pdf(pdf_path, sha, cache, parser, max_pages, early_stop)
+        return
+
+    # The cache (and its manifest) is not pickled per task: each worker
+    # builds its own from the cache directory once
+    init_args = (str(cache.root), cache.rebuild) if cache else (None, False)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=init_args) as pool:
+        futures = [pool.submit(_process_in_worker, str(p), sha, parser, max_pages, early_stop) for p, sha in pending]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def extract_file(pdf_path, cache=None, max_pages=0, early_stop=False):
+    """Extract one datasheet and return its spec record.
+
+    Raises ExtractionError when the PDF cannot be parsed.
+    """
+    res = next(extract_corpus([pdf_path], 1, cache, max_pages, early_stop))
+    if "error" in res:
+        raise ExtractionError(f"{res['file']}: {res['error']}")
+    return res["output"]
+
+
+def write_spec_file(output, specs_dir=SPECS_DIR):
+    """Save the per-product JSON next to its brand folder."""
+    img_slug = Path(output["image_url"]).stem
+    out_file = Path(specs_dir) / output["brand"].lower() / f"{img_slug}.json"
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_file, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    return out_file
+
+
+def spec_file_path(pdf_path, specs_dir=SPECS_DIR):
+    """Per-product JSON written by write_spec_file() for a given datasheet."""
+    pdf_path = Path(pdf_path)
+    brand, _ = slug_to_info(str(pdf_path))
+    img_slug = pdf_path.stem.replace("-datasheet", "").replace("-specs", "")
+    return Path(specs_dir) / brand.lower() / f"{img_slug}.json"
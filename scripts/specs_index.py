@@ -0,0 +1,220 @@
+"""Incremental, crash-safe writer for public/specs/index.json.
+
+Records are appended to an NDJSON journal as soon as they are produced, so
+nothing is held in memory during a run and a crash loses nothing: the next
+run replays the leftover journal first. compact() folds the journal into
+index.json with an atomic rename, then drops the journal.
+
+Journal ops (one JSON object per line):
+  {"op": "begin", "full": true|false, "at": ...}   start of a run / batch
+  {"op": "put", "source": <pdf path>, "record": {...}}
+  {"op": "fail", "source": <pdf path>, "error": "..."}
+  {"op": "del", "source": <pdf path>}
+  {"op": "end"}                                      run completed
+
+A completed full run replaces the index (records in sorted source order,
+as a from-scratch run would write them). A partial run, a watch batch or an
+interrupted full run is merged into the existing index keyed by datasheet
+URL (brand folder + file name: two brands may ship the same file stem).
+
+Compaction streams: the journal is scanned for offsets only, and the
+existing index.json (or, after a full run, the journal's records) is
+copied record by record into the new file, with the journal's puts and
+deletes applied on the way. Memory stays at one record plus the keys.
+"""
+
+import contextlib
+import datetime
+import json
+import os
+import shutil
+from pathlib import Path
+
+from atomic_file import AtomicFile, write_atomic
+from json_stream import iter_json_array
+from specs_extractor import CACHE_DIR, SPECS_DIR, datasheet_url
+
+PRODUCTS_LINE = '  "products": ['  # Top-level products array in index.json
+
+
+class IndexStore:
+    """index.json plus its append-only journal and per-file error state."""
+
+    def __init__(self, specs_dir=SPECS_DIR, state_dir=CACHE_DIR):
+        self.index_path = Path(specs_dir) / "index.json"
+        self.journal_path = Path(state_dir) / "index.journal.ndjson"
+        self.errors_path = Path(state_dir) / "index-errors.json"
+        self._journal = None
+
+    # ── Journal ──────────────────────────────────────────────────────
+    def _append(self, entry):
+        if self._journal is None:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._journal.flush()
+
+    def begin(self, full):
+        self._append({"op": "begin", "full": full, "at": datetime.datetime.now().isoformat()})
+
+    def put(self, record, source):
+        self._append({"op": "put", "source": str(source), "record": record})
+
+    def fail(self, source, error):
+        self._append({"op": "fail", "source": str(source), "error": error})
+
+    def remove(self, source):
+        self._append({"op": "del", "source": str(source)})
+
+    def end(self):
+        self._append({"op": "end"})
+
+    def close(self):
+        if self._journal is not None:
+            os.fsync(self._journal.fileno())
+            self._journal.close()
+            self._journal = None
+
+    def _segments(self):
+        """Journal ops grouped by run, as (op, key, source, offset, error)
+        tuples (records are re-read by offset); a torn last line is ignored."""
+        segments = []
+        if not self.journal_path.exists():
+            return segments
+        with open(self.journal_path, "rb") as f:
+            offset = 0
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if entry["op"] == "begin" or not segments:
+                    segments.append({"full": entry.get("full", False), "done": False, "ops": []})
+                if entry["op"] == "end":
+                    segments[-1]["done"] = True
+                elif entry["op"] != "begin":
+                    source = entry["source"]
+                    segments[-1]["ops"].append((entry["op"], datasheet_url(source), source, offset, entry.get("error")))
+                offset += len(line)
+        return segments
+
+    def pending(self):
+        """True when a journal is waiting to be compacted (e.g. after a crash)."""
+        return self.journal_path.exists() and self.journal_path.stat().st_size > 0
+
+    # ── Compaction ───────────────────────────────────────────────────
+    def _index_records(self):
+        """Stream the records of the current index.json."""
+        if not self.index_path.exists():
+            return
+        with open(self.index_path, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith(PRODUCTS_LINE):
+                    f = _Prepend(line[len(PRODUCTS_LINE) - 1:], f)
+                    yield from iter_json_array(f)
+                    return
+        # Not in our layout (edited by hand?): read it whole
+        with open(self.index_path, encoding="utf-8") as f:
+            yield from json.load(f).get("products", [])
+
+    def compact(self):
+        """Fold the journal into index.json (atomic rename) and drop it.
+
+        Replaying is idempotent, so a crash between the rename and the
+        journal removal is harmless. Returns the index summary.
+        """
+        self.close()
+        segments = self._segments()
+        base = None  # last completed full run: replaces everything before it
+        for i, seg in enumerate(segments):
+            if seg["full"] and seg["done"]:
+                base = i
+
+        errors = {}
+        if base is None and self.errors_path.exists():
+            with open(self.errors_path, encoding="utf-8") as f:
+                errors = json.load(f)
+        full_puts = {}  # key → (source, offset) of the full run's records
+        changes = {}    # key → journal offset of the new record, or None (deleted)
+        for i, seg in enumerate(segments):
+            if base is not None and i < base:
+                continue
+            for op, key, source, offset, error in seg["ops"]:
+                if i == base:
+                    if op == "put":
+                        full_puts[key] = (source, offset)
+                    elif op == "fail":
+                        errors[source] = error
+                    continue
+                if op == "put":
+                    changes[key] = offset
+                    errors.pop(source, None)
+                elif op == "fail":
+                    errors[source] = error
+                elif op == "del":
+                    changes[key] = None
+                    errors.pop(source, None)
+
+        body = self.index_path.with_name(f".{self.index_path.name}.{os.getpid()}.body")
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        total = 0
+        with open(self.journal_path, "rb") if segments else contextlib.nullcontext() as journal, \
+                open(body, "w", encoding="utf-8") as out:
+
+            def record_at(offset):
+                journal.seek(offset)
+                return json.loads(journal.readline())["record"]
+
+            def write(record):
+                nonlocal total
+                text = json.dumps(record, indent=2, ensure_ascii=False).replace("\n", "\n    ")
+                out.write(("," if total else "") + "\n    " + text)
+                total += 1
+
+            if base is not None:
+                ordered = sorted(full_puts.items(), key=lambda kv: Path(kv[1][0]))
+                existing = ((key, lambda offset=offset: record_at(offset)) for key, (_, offset) in ordered)
+            else:
+                existing = ((r.get("datasheet_url") or r["sku"], lambda r=r: r) for r in self._index_records())
+            for key, load in existing:
+                if key in changes:
+                    offset = changes.pop(key)
+                    if offset is not None:
+                        write(record_at(offset))
+                else:
+                    write(load())
+            for offset in changes.values():
+                if offset is not None:
+                    write(record_at(offset))
+
+        summary = {
+            "generated_at": datetime.datetime.now().isoformat(),
+            "total": total,
+            "errors": len(errors),
+        }
+        try:
+            with AtomicFile(self.index_path) as f, open(body, encoding="utf-8") as src:
+                head = json.dumps(summary, indent=2, ensure_ascii=False)[:-2]
+                f.write(head + ",\n" + PRODUCTS_LINE)
+                shutil.copyfileobj(src, f.file)
+                f.write("\n  ]\n}" if total else "]\n}")
+                f.commit()
+        finally:
+            body.unlink(missing_ok=True)
+        write_atomic(self.errors_path, json.dumps(errors, indent=1, ensure_ascii=False))
+        self.journal_path.unlink(missing_ok=True)
+        return summary
+
+
+class _Prepend:
+    """Text file whose first read() returns ``head`` before the file's rest."""
+
+    def __init__(self, head, f):
+        self.head = head
+        self.f = f
+
+    def read(self, size=-1):
+        if self.head:
+            head, self.head = self.head, ""
+            return head
+        return self.f.read(size)
@@ -0,0 +1,165 @@
+"""mirror-datasheets.py against a local http.server stand-in.
+
+Run: python3 -m unittest discover scripts/tests
+"""
+
+import contextlib
+import hashlib
+import importlib.util
+import io
+import json
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from catalog_store import CatalogStore, SourceChanged  # noqa: E402
+
+spec = importlib.util.spec_from_file_location("mirror_datasheets", SCRIPT_DIR / "mirror-datasheets.py")
+mirror_datasheets = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mirror_datasheets)
+
+PDF_A = b"%PDF-1.4 huawei sun2000-8k-lc0\n" + b"a" * 4096
+PDF_B = b"%PDF-1.4 deye sun-10k-sg04lp3\n" + b"b" * 4096
+PDF_SERIES = b"%PDF-1.4 hoymiles hms series\n" + b"s" * 4096
+
+PAGES = {
+    "/a.pdf": ("application/pdf", PDF_A),
+    "/deye/sun-10k.html": ("text/html", b'<html><a href="/files/sun-10k-sg04lp3-datasheet.pdf">PDF</a>'
+                                        b'<a href="/files/other-5k-datasheet.pdf">PDF</a></html>'),
+    "/files/sun-10k-sg04lp3-datasheet.pdf": ("application/pdf", PDF_B),
+    # One series datasheet published under two URLs
+    "/hms-600.pdf": ("application/pdf", PDF_SERIES),
+    "/hms-800.pdf": ("application/pdf", PDF_SERIES),
+}
+
+
+class StandIn(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        page = PAGES.get(self.path)
+        if page is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        content_type, body = page
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MirrorDatasheetsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.dir = self.tmp / "datasheets"
+        self.catalog = self.tmp / "zoho-products.json"
+        self.products = [
+            {"sku": "HUA/SUN2000-8K-LC0", "brand": "HUAWEI", "datasheet": f"{self.base}/a.pdf"},
+            {"sku": "DEY/SUN-10K-SG04LP3-EU", "brand": "DEYE", "datasheet": f"{self.base}/deye/sun-10k.html"},
+            {"sku": "HM/HMS-600-2T", "brand": "HOYMILES", "datasheet": f"{self.base}/hms-600.pdf"},
+            {"sku": "HM/HMS-800-2T", "brand": "HOYMILES", "datasheet": f"{self.base}/hms-800.pdf"},
+            {"sku": "ESD/CLICK-1", "brand": "ESDEC", "datasheet": f"{self.base}/gone.pdf"},
+            {"sku": "PYT/E-BOX", "brand": "PYTES", "datasheet": "/datasheets/pytes/e-box.pdf"},
+        ]
+        self.catalog.write_text(json.dumps(self.products, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def run_mirror(self, *extra):
+        argv = ["--catalog", str(self.catalog), "--dir", str(self.dir), "--hash-cache", str(self.tmp / "hashes.json"),
+                "--workers", "4", "--rate", "1000", "--retries", "0", *extra]
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(mirror_datasheets.main(argv), 0)
+        return {p["sku"]: p["datasheet"] for p in json.loads(self.catalog.read_text(encoding="utf-8"))}
+
+    def local_file(self, url):
+        self.assertTrue(url.startswith("/datasheets/"), url)
+        return self.dir / url[len("/datasheets/"):]
+
+    def test_mirror(self):
+        links = self.run_mirror()
+
+        # Direct PDF and PDF found through an HTML page, stored by content hash
+        for sku, body, brand in (("HUA/SUN2000-8K-LC0", PDF_A, "huawei"), ("DEY/SUN-10K-SG04LP3-EU", PDF_B, "deye")):
+            self.assertEqual(links[sku], f"/datasheets/{brand}/{hashlib.sha256(body).hexdigest()[:16]}.pdf")
+            self.assertEqual(self.local_file(links[sku]).read_bytes(), body)
+
+        # The series PDF behind two URLs is stored once
+        self.assertEqual(links["HM/HMS-600-2T"], links["HM/HMS-800-2T"])
+        self.assertEqual(len(list(self.dir.rglob("*.pdf"))), 3)
+
+        # Broken link: URL kept, listed in the report with its SKU; local links untouched
+        self.assertEqual(links["ESD/CLICK-1"], f"{self.base}/gone.pdf")
+        self.assertEqual(links["PYT/E-BOX"], "/datasheets/pytes/e-box.pdf")
+        report = (self.dir / mirror_datasheets.REPORT_NAME).read_text(encoding="utf-8")
+        self.assertIn(f"{self.base}/gone.pdf", report)
+        self.assertIn("ESD/CLICK-1", report)
+        self.assertNotIn("/a.pdf", report)
+
+    def test_second_run_reuses_hashes_and_files(self):
+        self.run_mirror()
+        before = self.catalog.read_bytes()
+
+        # A PDF copied in by hand since the last run is the only file hashed again
+        hand = self.dir / "hoymiles" / "hms-series.pdf"
+        hand.write_bytes(PDF_SERIES)
+        hashed = []
+        original = mirror_datasheets.sha256_file
+        mirror_datasheets.sha256_file = lambda path: hashed.append(Path(path).name) or original(path)
+        try:
+            self.run_mirror()
+        finally:
+            mirror_datasheets.sha256_file = original
+
+        self.assertEqual(hashed, ["hms-series.pdf"])  # only the new file; the rest came from the hash cache
+        self.assertEqual(self.catalog.read_bytes(), before)
+        self.assertEqual(len(list(self.dir.rglob("*.pdf"))), 4)
+
+    def test_store_mode_keeps_outside_edits(self):
+        store_file = self.tmp / "catalog.sqlite"
+        links = self.run_mirror("--store", str(store_file))
+        self.assertTrue(links["HUA/SUN2000-8K-LC0"].startswith("/datasheets/huawei/"))
+        self.assertEqual(links["ESD/CLICK-1"], f"{self.base}/gone.pdf")
+
+        # A manual edit after the import is picked up by the next run, not overwritten
+        products = json.loads(self.catalog.read_text(encoding="utf-8"))
+        products[4]["datasheet"] = f"{self.base}/a.pdf"
+        self.catalog.write_text(json.dumps(products, ensure_ascii=False, indent=2), encoding="utf-8")
+        links = self.run_mirror("--store", str(store_file))
+        self.assertEqual(links["ESD/CLICK-1"], links["HUA/SUN2000-8K-LC0"])
+
+        # A store update never exports over a file changed since the last export
+        with CatalogStore(store_file) as store:
+            store.update("zoho", {"PYT/E-BOX": {"datasheet": "/datasheets/pytes/other.pdf"}}, step="test")
+            self.catalog.write_text(self.catalog.read_text(encoding="utf-8") + "\n", encoding="utf-8")
+            with self.assertRaises(SourceChanged):
+                store.export("zoho")
+            self.assertTrue(store.export("zoho", force=True))
+        self.assertEqual(json.loads(self.catalog.read_text(encoding="utf-8"))[5]["datasheet"],
+                         "/datasheets/pytes/other.pdf")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+"""scraper_net.HttpClient / HostRateLimiter against a local http.server stand-in.
+
+Run: python3 -m unittest discover scripts/tests
+"""
+
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+import requests  # noqa: E402
+
+from scraper_net import (  # noqa: E402
+    HostRateLimiter,
+    HttpClient,
+    ResponseTooLarge,
+    is_permanent_failure,
+    iter_capped,
+    run_concurrently,
+)
+
+BODY = b"\xff\xd8\xff" + b"j" * 1024
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Answers each path with the next (status, headers) of SCRIPTS[path], then 200."""
+
+    scripts = {}
+    hits = {}
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        with self.lock:
+            self.hits.setdefault(self.path, []).append(time.monotonic())
+            script = self.scripts.get(self.path) or [(200, {})]
+            status, headers = script.pop(0) if len(script) > 1 else script[0]
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        body = BODY if status == 200 else b""
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class HttpClientTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+        cls.port = cls.server.server_address[1]
+        cls.base = f"http://127.0.0.1:{cls.port}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StandIn.scripts.clear()
+        StandIn.hits.clear()
+
+    def client(self, **kwargs):
+        # backoff=0: any wait between attempts comes from Retry-After
+        return HttpClient(**{"retries": 3, "backoff": 0, "pool_size": 8, **kwargs})
+
+    def test_rate_limit_per_host(self):
+        rate = 20
+        http = self.client(limiter=HostRateLimiter(rate=rate, burst=1))
+        urls = [f"{self.base}/img/{i}.jpg" for i in range(6)]
+        # A second host name for the same server gets its own bucket
+        other = [f"http://localhost:{self.port}/other/{i}.jpg" for i in range(6)]
+
+        results = list(run_concurrently(lambda url: http.get(url).status_code, urls + other, workers=8))
+        self.assertEqual([status for _, status in results], [200] * 12)
+
+        for prefix in ("/img/", "/other/"):
+            times = sorted(t for path, hits in StandIn.hits.items() if path.startswith(prefix) for t in hits)
+            gaps = [b - a for a, b in zip(times, times[1:])]
+            self.assertGreaterEqual(min(gaps), 0.8 / rate, prefix)
+        first = min(t for path, hits in StandIn.hits.items() for t in hits)
+        # Both hosts are served side by side, not one after the other
+        self.assertLess(max(StandIn.hits["/other/0.jpg"]) - first, 3 / rate)
+
+    def test_retries_429_and_503_after_retry_after(self):
+        StandIn.scripts["/busy.jpg"] = [(429, {"Retry-After": "1"}), (503, {}), (200, {})]
+        http = self.client()
+        start = time.monotonic()
+        resp = http.get(f"{self.base}/busy.jpg")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.content, BODY)
+        self.assertEqual(len(StandIn.hits["/busy.jpg"]), 3)
+        hits = StandIn.hits["/busy.jpg"]
+        self.assertGreaterEqual(hits[1] - hits[0], 0.9)  # Retry-After honoured
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(http.stats.summary()["retries"], 2)
+
+    def test_gives_up_after_retries(self):
+        StandIn.scripts["/down.jpg"] = [(503, {})]
+        http = self.client(retries=2)
+        resp = http.get(f"{self.base}/down.jpg")
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(len(StandIn.hits["/down.jpg"]), 3)
+        with self.assertRaises(requests.HTTPError) as ctx:
+            resp.raise_for_status()
+        self.assertFalse(is_permanent_failure(ctx.exception))
+
+    def test_no_retry_on_permanent_4xx(self):
+        for status in (403, 404, 410):
+            path = f"/gone-{status}.jpg"
+            StandIn.scripts[path] = [(status, {"Retry-After": "1"})]
+            http = self.client()
+            resp = http.get(f"{self.base}{path}")
+            self.assertEqual(resp.status_code, status)
+            self.assertEqual(len(StandIn.hits[path]), 1)
+            self.assertEqual(http.stats.summary()["retries"], 0)
+            with self.assertRaises(requests.HTTPError) as ctx:
+                resp.raise_for_status()
+            self.assertTrue(is_permanent_failure(ctx.exception))
+
+    def test_size_cap(self):
+        http = self.client()
+        resp = http.get(f"{self.base}/big.jpg", stream=True)
+        with self.assertRaises(ResponseTooLarge):
+            list(iter_capped(resp, len(BODY) - 1))
+        resp = http.get(f"{self.base}/big.jpg", stream=True)
+        self.assertEqual(b"".join(iter_capped(resp, len(BODY))), BODY)
+
+
+if __name__ == "__main__":
+    unittest.main()